@@ -5,15 +5,24 @@ Simulates the bot's behavior over historical data and tracks trade outcomes.
 import asyncio
 import time
 import csv
+import io
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, NamedTuple, Optional, Tuple
 from dotenv import load_dotenv
 
+import src  # Sets the shared NUMBA_CACHE_DIR default; must come before numba
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import ccxt.pro as ccxtpro
+from numba import njit
 
-from src.layers import find_layers, find_nearest_layer
-from src.utils import calculate_atr, calculate_adx, is_ranging, calculate_position_size
+from src.layers import Layer, rolling_nearest_layer_kernel
+from src.utils import (
+    compute_atr_series, compute_adx_series, compute_volume_ratio_series,
+    is_ranging, calculate_position_size, run_async
+)
 from src.grok import GrokClient
 
 load_dotenv()
@@ -24,6 +33,14 @@ TIMEFRAME = "1m"
 LOOKBACK_DAYS = 3
 LOOKBACK_CANDLES = 60  # For layer detection
 
+# Data fetching
+FETCH_LIMIT = 1500  # Binance max candles per request
+FETCH_CONCURRENCY = 4  # Parallel fetch_ohlcv requests
+CACHE_DIR = "cache"  # Parquet cache of complete UTC days
+DAY_MS = 24 * 60 * 60 * 1000
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+GROK_CACHE_DIR = os.path.join(CACHE_DIR, "grok")  # Grok responses by prompt hash
+
 # Trading parameters
 ACCOUNT_BALANCE = 1000
 MAX_RISK_PERCENT = 0.2
@@ -36,44 +53,245 @@ HIGH_CONFIDENCE = 80
 COOLDOWN_CANDLES = 1  # No cooldown for backtest - max speed
 MIN_LAYER_STRENGTH = 2  # Only analyze layers with strength >= 2
 MAX_GROK_CALLS = 10  # Only 10 random setups for quick backtest
+GROK_CONCURRENCY = 5  # Max parallel Grok API calls
 
 # Cost tracking
 GROK_COST_PER_CALL = 0.00028
 
 
-class BacktestTrade:
-    """Represents a single backtest trade."""
+class Setup(NamedTuple):
+    """A sampled setup waiting for Grok analysis."""
+    idx: int
+    price: float
+    layer: Layer
+    atr: float
+    adx: float
+    market_status: str
+    volume_ratio: float
+
+
+@njit(cache=True)
+def scan_setups(highs, lows, closes, volumes, lookback, threshold_pct, min_strength, sample_size, seed):
+    """
+    Phase 1 scan over OHLCV column arrays: one setup per candle that sits near a layer.
+
+    Setups are reservoir-sampled (Algorithm R) down to `sample_size` while scanning,
+    so memory stays O(sample_size) however long the history is.
+
+    Returns: (setups found, then parallel arrays for the sample in scan order:
+    idx, atr, adx, volume_ratio, layer_price, is_resistance, strength, touches, distance_pct)
+    """
+    np.random.seed(seed)
+    n = len(closes)
+
+    # Indicators are causal, so one pass over the full history replaces
+    # recomputing them on every sliding window
+    atr_series = compute_atr_series(highs, lows, closes, 14)
+    adx_series = compute_adx_series(highs, lows, closes, 14)
+    volume_ratio_series = compute_volume_ratio_series(volumes, lookback + 1)
+
+    cap = max(min(sample_size, n - lookback), 0)
+    idx = np.empty(cap, dtype=np.int64)
+    atr = np.empty(cap)
+    adx = np.empty(cap)
+    volume_ratio = np.empty(cap)
+    layer_price = np.empty(cap)
+    is_resistance = np.empty(cap, dtype=np.bool_)
+    strength = np.empty(cap, dtype=np.int64)
+    touches = np.empty(cap, dtype=np.int64)
+    distance_pct = np.empty(cap)
+
+    # Nearest layer of every (lookback + 1)-bar window in one rolling pass
+    near_price, near_is_res, near_strength, near_touches, near_dist = rolling_nearest_layer_kernel(
+        highs, lows, closes, volumes, lookback + 1, threshold_pct, 0.1, 4)
+
+    seen = 0
+    for i in range(lookback, n):
+        if np.isnan(near_price[i]) or near_strength[i] < min_strength:
+            continue
+
+        seen += 1
+        if seen <= cap:
+            k = seen - 1
+        else:
+            k = np.random.randint(0, seen)
+            if k >= cap:
+                continue
+
+        idx[k] = i
+        atr[k] = atr_series[i]
+        adx[k] = adx_series[i]
+        volume_ratio[k] = volume_ratio_series[i]
+        layer_price[k] = near_price[i]
+        is_resistance[k] = near_is_res[i]
+        strength[k] = near_strength[i]
+        touches[k] = near_touches[i]
+        distance_pct[k] = near_dist[i]
+
+    k = min(seen, cap)
+    order = np.argsort(idx[:k])  # Replacements scramble the reservoir; restore time order
+    return (seen, idx[order], atr[order], adx[order], volume_ratio[order], layer_price[order],
+            is_resistance[order], strength[order], touches[order], distance_pct[order])
+
+
+# find_exit result codes
+RESULT_OPEN = 0
+RESULT_WIN = 1
+RESULT_LOSS = -1
+RESULT_LABELS = {RESULT_OPEN: 'OPEN', RESULT_WIN: 'WIN', RESULT_LOSS: 'LOSS'}
+
+# Trade directions
+DIRECTION_LONG = 1
+DIRECTION_SHORT = -1
+
+# One record per backtest trade; the free-text Grok reasons live in a parallel list.
+# exit_idx is -1 and exit_price NaN while a trade is open.
+TRADE_DTYPE = np.dtype([
+    ('entry_idx', 'i8'),
+    ('exit_idx', 'i8'),
+    ('entry_price', 'f8'),
+    ('exit_price', 'f8'),
+    ('tp', 'f8'),
+    ('sl', 'f8'),
+    ('confidence', 'i2'),
+    ('direction', 'i1'),   # DIRECTION_*
+    ('result', 'i1'),      # RESULT_*
+    ('pnl_percent', 'f8'),
+    ('pnl_usd', 'f8'),
+])
+
+
+@njit(cache=True)
+def find_exit(highs, lows, tp, sl, is_long):
+    """
+    Walk candles after entry until TP or SL is hit (TP wins when both hit on one candle).
+
+    Returns: (offset of the exit candle, exit price, RESULT_* code); offset is -1 while open
+    """
+    for i in range(len(highs)):
+        if is_long:
+            if highs[i] >= tp:
+                return i, tp, RESULT_WIN
+            if lows[i] <= sl:
+                return i, sl, RESULT_LOSS
+        else:
+            if lows[i] <= tp:
+                return i, tp, RESULT_WIN
+            if highs[i] >= sl:
+                return i, sl, RESULT_LOSS
+    return -1, 0.0, RESULT_OPEN
+
+
+# 'HH:MM' for every minute of the day, indexed by minute-of-day
+HHMM_LABELS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)])
+
+
+def format_timestamps(ts_ms: np.ndarray) -> np.ndarray:
+    """Format millisecond timestamps as 'YYYY-MM-DD HH:MM' (UTC) in one vectorized pass."""
+    if len(ts_ms) == 0:
+        return np.empty(0, dtype='<U16')
+    minutes = np.datetime_as_string(ts_ms.astype('datetime64[ms]'), unit='m')
+    return np.char.replace(minutes, 'T', ' ')
+
+
+def setup_key(setup: Setup) -> Tuple:
+    """
+    Coarse feature key for a setup: setups sharing a key get the same Grok verdict.
     
-    def __init__(self, entry_idx: int, entry_price: float, direction: str,
-                 tp: float, sl: float, confidence: int, reason: str):
-        self.entry_idx = entry_idx
-        self.entry_price = entry_price
-        self.direction = direction
-        self.tp = tp
-        self.sl = sl
-        self.confidence = confidence
-        self.reason = reason
-        self.exit_idx: Optional[int] = None
-        self.exit_price: Optional[float] = None
-        self.result: Optional[str] = None  # 'WIN', 'LOSS', 'OPEN'
-        self.pnl_percent: float = 0.0
-        self.pnl_usd: float = 0.0
+    Values are rounded to roughly the precision the prompt shows, so near-identical
+    setups collapse into one call.
+    """
+    layer = setup.layer
+    return (
+        round(setup.price, 6), layer.layer_type, round(layer.price, 6),
+        round(setup.atr, 4), round(setup.adx, 1), setup.market_status,
+        round(setup.volume_ratio, 1)
+    )
+
+
+def warmup() -> None:
+    """Compile (or load from the on-disk cache) every numba kernel the backtest uses."""
+    ones = np.ones(LOOKBACK_CANDLES + 10)
+    scan_setups(ones, ones, ones, ones, LOOKBACK_CANDLES, LAYER_THRESHOLD_PCT,
+                MIN_LAYER_STRENGTH, MAX_GROK_CALLS, 0)
+    find_exit(ones, ones, 1.1, 0.9, True)
+    is_ranging(20.0)
 
 
 class Backtester:
     """Main backtesting engine."""
     
     def __init__(self):
-        self.grok = GrokClient()
-        self.trades: List[BacktestTrade] = []
+        self.grok = GrokClient(cache_dir=GROK_CACHE_DIR)
+        self.trades = np.empty(0, dtype=TRADE_DTYPE)
+        self.trade_reasons: List[str] = []
         self.grok_calls = 0
         self.setups_found = 0
         self.total_cost = 0.0
+        # OHLCV as an (N, 6) float64 array in column-major order, so each
+        # column (arr[:, 2] = highs, ...) is a contiguous view
+        self.candles_np: Optional[np.ndarray] = None
+        self.timestamps: Optional[np.ndarray] = None  # int64 ms
+        self.ts_hhmm: Optional[np.ndarray] = None  # 'HH:MM' (UTC) per candle
+        self.pct_change: Optional[np.ndarray] = None  # close vs open, % per candle
         
-    async def fetch_historical_data(self) -> List[List]:
-        """Fetch historical OHLCV data from Binance."""
+    async def fetch_historical_data(self) -> np.ndarray:
+        """
+        Fetch historical OHLCV data from Binance.
+        
+        Complete UTC days are served from the parquet cache when available; only the
+        missing days and the current (in-progress) day are fetched.
+        
+        Returns: (N, 6) float64 array of [timestamp, open, high, low, close, volume]
+        """
         print(f"\n[Backtest] Fetching {LOOKBACK_DAYS} days of historical data...")
         
+        # Calculate start time (3 days ago)
+        end_time = int(datetime.now().timestamp() * 1000)
+        start_time = end_time - (LOOKBACK_DAYS * DAY_MS)
+        
+        days: Dict[int, np.ndarray] = {}
+        missing = []
+        for day_start in range(start_time - start_time % DAY_MS, end_time, DAY_MS):
+            path = self.day_cache_path(day_start)
+            if day_start + DAY_MS <= end_time and os.path.exists(path):
+                days[day_start] = self.load_cached_day(path)
+            else:
+                missing.append(day_start)
+        
+        print(f"   Cached days: {len(days)}, days to fetch: {len(missing)}")
+        
+        if missing:
+            # (since, limit) windows capped at their day's end: a day is 1440 bars, so an
+            # uncapped FETCH_LIMIT window would spill into (and duplicate) the next day
+            windows = [
+                (since, min(FETCH_LIMIT, (day_start + DAY_MS - since) // 60000))
+                for day_start in missing
+                for since in range(day_start, min(day_start + DAY_MS, end_time), FETCH_LIMIT * 60000)
+            ]
+            fetched = np.asarray(await self.fetch_windows(windows), dtype=np.float64).reshape(-1, 6)
+            fetched_days = fetched[:, 0].astype(np.int64) // DAY_MS * DAY_MS
+            
+            for day_start in missing:
+                day = fetched[fetched_days == day_start]
+                days[day_start] = day
+                # Only complete days are immutable, so only those are persisted
+                if day_start + DAY_MS <= end_time and len(day):
+                    self.save_cached_day(self.day_cache_path(day_start), day)
+        
+        all_candles = np.concatenate([days[d] for d in sorted(days)])
+        
+        # Windows stay within their day, so this is only a safety net against the exchange
+        # returning a candle twice: dedupe on timestamp, keep time order
+        _, first = np.unique(all_candles[:, 0], return_index=True)
+        all_candles = all_candles[first]
+        all_candles = all_candles[(all_candles[:, 0] >= start_time) & (all_candles[:, 0] <= end_time)]
+        
+        print(f"\n[Backtest] Total candles fetched: {len(all_candles)}")
+        return all_candles
+    
+    async def fetch_windows(self, windows: List[Tuple[int, int]]) -> List[List]:
+        """Fetch (since, limit) candle windows from Binance concurrently."""
         exchange = ccxtpro.binance({
             'timeout': 60000,
             'options': {'defaultType': 'swap'}
@@ -96,99 +314,109 @@ class Backtester:
                     else:
                         raise Exception("Failed to connect to Binance after 5 attempts")
             
-            # Calculate start time (3 days ago)
-            end_time = int(datetime.now().timestamp() * 1000)
-            start_time = end_time - (LOOKBACK_DAYS * 24 * 60 * 60 * 1000)
-            
-            all_candles = []
-            current_time = start_time
+            # ccxt's rate limiter still paces the requests that get past the semaphore
+            semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
             
-            # Fetch in chunks (Binance limit is 1500 per request)
-            while current_time < end_time:
-                candles = await exchange.fetch_ohlcv(
-                    SYMBOL, TIMEFRAME,
-                    since=current_time,
-                    limit=1500
-                )
-                
-                if not candles:
-                    break
-                    
-                all_candles.extend(candles)
-                current_time = candles[-1][0] + 60000  # Move to next minute
-                
-                print(f"   Fetched {len(all_candles)} candles...", end='\r')
-                await asyncio.sleep(0.1)  # Rate limiting
+            async def fetch_window(since: int, limit: int) -> List[List]:
+                async with semaphore:
+                    return await exchange.fetch_ohlcv(
+                        SYMBOL, TIMEFRAME,
+                        since=since,
+                        limit=limit
+                    )
             
-            print(f"\n[Backtest] Total candles fetched: {len(all_candles)}")
-            return all_candles
+            print(f"   Fetching {len(windows)} windows ({FETCH_CONCURRENCY} concurrent)...")
+            chunks = await asyncio.gather(*(fetch_window(since, limit) for since, limit in windows))
+            return [candle for chunk in chunks for candle in chunk]
             
         finally:
             await exchange.close()
     
-    def build_ohlcv_summary(self, candles: List[List], end_idx: int) -> str:
+    def day_cache_path(self, day_start: int) -> str:
+        """Parquet cache file for the UTC day starting at `day_start` (ms)."""
+        day = datetime.fromtimestamp(day_start / 1000, tz=timezone.utc).strftime('%Y%m%d')
+        symbol = SYMBOL.replace('/', '').replace(':', '_')
+        return os.path.join(CACHE_DIR, f"{symbol}_{TIMEFRAME}_{day}.parquet")
+    
+    def load_cached_day(self, path: str) -> np.ndarray:
+        """Load one cached day as an (N, 6) float64 array."""
+        table = pq.read_table(path)
+        return np.column_stack([
+            table.column(name).to_numpy().astype(np.float64) for name in OHLCV_COLUMNS
+        ])
+    
+    def save_cached_day(self, path: str, day: np.ndarray) -> None:
+        """Persist one complete day (written to a temp file first so readers never see a partial file)."""
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        table = pa.table({
+            name: day[:, k].astype(np.int64) if name == 'timestamp' else day[:, k]
+            for k, name in enumerate(OHLCV_COLUMNS)
+        })
+        tmp_path = path + '.tmp'
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+    
+    def build_ohlcv_summary(self, end_idx: int) -> str:
         """Build OHLCV summary string for Grok prompt."""
-        summary_lines = []
         start_idx = max(0, end_idx - 10)
+        summary_lines = [None] * (end_idx - start_idx)
         
-        for i in range(start_idx, end_idx):
-            c = candles[i]
-            change = ((c[4] - c[1]) / c[1]) * 100
-            sign = '+' if change >= 0 else ''
-            dt = datetime.fromtimestamp(c[0] / 1000).strftime('%H:%M')
-            summary_lines.append(
-                f"{dt}: O={c[1]:.8f} H={c[2]:.8f} L={c[3]:.8f} C={c[4]:.8f} ({sign}{change:.2f}%)"
+        for k, i in enumerate(range(start_idx, end_idx)):
+            _, o, h, l, c, _ = self.candles_np[i]
+            summary_lines[k] = "%s: O=%.8f H=%.8f L=%.8f C=%.8f (%+.2f%%)" % (
+                self.ts_hhmm[i], o, h, l, c, self.pct_change[i]
             )
         
         return '\n'.join(summary_lines)
     
-    def check_trade_outcome(self, trade: BacktestTrade, candles: List[List]) -> None:
-        """Check if TP or SL was hit after trade entry."""
-        for i in range(trade.entry_idx + 1, len(candles)):
-            high = candles[i][2]
-            low = candles[i][3]
-            
-            if trade.direction == 'LONG':
-                # Check if TP hit (high reached TP)
-                if high >= trade.tp:
-                    trade.exit_idx = i
-                    trade.exit_price = trade.tp
-                    trade.result = 'WIN'
-                    trade.pnl_percent = ((trade.tp - trade.entry_price) / trade.entry_price) * 100
-                    break
-                # Check if SL hit (low reached SL)
-                elif low <= trade.sl:
-                    trade.exit_idx = i
-                    trade.exit_price = trade.sl
-                    trade.result = 'LOSS'
-                    trade.pnl_percent = ((trade.sl - trade.entry_price) / trade.entry_price) * 100
-                    break
-            else:  # SHORT
-                # Check if TP hit (low reached TP)
-                if low <= trade.tp:
-                    trade.exit_idx = i
-                    trade.exit_price = trade.tp
-                    trade.result = 'WIN'
-                    trade.pnl_percent = ((trade.entry_price - trade.tp) / trade.entry_price) * 100
-                    break
-                # Check if SL hit (high reached SL)
-                elif high >= trade.sl:
-                    trade.exit_idx = i
-                    trade.exit_price = trade.sl
-                    trade.result = 'LOSS'
-                    trade.pnl_percent = ((trade.entry_price - trade.sl) / trade.entry_price) * 100
-                    break
+    def check_trade_outcome(self, k: int) -> None:
+        """Check if TP or SL was hit after entry of trade k."""
+        trade = self.trades[k]  # Record view: field writes land in self.trades
+        start = trade['entry_idx'] + 1
+        is_long = trade['direction'] == DIRECTION_LONG
+        offset, exit_price, result = find_exit(
+            self.candles_np[start:, 2], self.candles_np[start:, 3],
+            trade['tp'], trade['sl'], is_long
+        )
+        trade['result'] = result
+        if result == RESULT_OPEN:
+            return
         
-        if trade.result is None:
-            trade.result = 'OPEN'
+        entry_price = trade['entry_price']
+        trade['exit_idx'] = start + offset
+        trade['exit_price'] = exit_price
+        if is_long:
+            trade['pnl_percent'] = ((exit_price - entry_price) / entry_price) * 100
+        else:
+            trade['pnl_percent'] = ((entry_price - exit_price) / entry_price) * 100
         
         # Calculate USD P&L based on position size
-        if trade.result != 'OPEN':
-            position_size = calculate_position_size(
-                ACCOUNT_BALANCE, MAX_RISK_PERCENT,
-                trade.entry_price, trade.sl, LEVERAGE
+        position_size = calculate_position_size(
+            ACCOUNT_BALANCE, MAX_RISK_PERCENT,
+            entry_price, trade['sl'], LEVERAGE
+        )
+        trade['pnl_usd'] = position_size * (trade['pnl_percent'] / 100) * LEVERAGE
+    
+    async def analyze_setup(self, setup: Setup, semaphore: asyncio.Semaphore) -> Dict:
+        """Run the (blocking) Grok call for one setup in a worker thread, bounded by the semaphore."""
+        near_layer = setup.layer
+        ohlcv_summary = self.build_ohlcv_summary(setup.idx)
+        
+        async with semaphore:
+            return await asyncio.to_thread(
+                self.grok.analyze_technical,
+                price=setup.price,
+                layer_type=near_layer.layer_type,
+                layer_price=near_layer.price,
+                layer_distance=near_layer.distance_pct,
+                layer_strength=f"{near_layer.strength}/3",
+                layer_touches=near_layer.touches,
+                ohlcv_summary=ohlcv_summary,
+                atr_value=setup.atr,
+                adx_value=setup.adx,
+                market_status=setup.market_status,
+                volume_ratio=setup.volume_ratio
             )
-            trade.pnl_usd = position_size * (trade.pnl_percent / 100) * LEVERAGE
     
     async def run_backtest(self) -> Dict:
         """Run the full backtest."""
@@ -198,171 +426,159 @@ class Backtester:
         print("PEPE SCALPING BOT - 3-DAY BACKTEST (10 Random Setups)")
         print("=" * 60)
         
+        # JIT warmup runs in a thread while the fetch waits on the network
+        warmup_task = asyncio.create_task(asyncio.to_thread(warmup))
+        
         # Fetch historical data
         candles = await self.fetch_historical_data()
+        await warmup_task
         
         if len(candles) < LOOKBACK_CANDLES + 100:
             print("[Backtest] ERROR: Not enough candles fetched")
             return {}
         
-        total_candles = len(candles)
+        # Convert once to a contiguous-column array; everything downstream uses views of it
+        self.candles_np = np.asfortranarray(np.asarray(candles, dtype=np.float64))
+        self.timestamps = self.candles_np[:, 0].astype(np.int64)
+        self.ts_hhmm = HHMM_LABELS[(self.timestamps // 60000) % 1440]
+        self.pct_change = (self.candles_np[:, 4] - self.candles_np[:, 1]) / self.candles_np[:, 1] * 100
+        total_candles = len(self.candles_np)
         
         print(f"\n[Backtest] Phase 1: Scanning for setups...")
         print(f"   Total candles: {total_candles}")
         
-        # Phase 1: Collect all potential setups (fast, no API calls)
-        all_setups = []
+        # Phase 1 + 2: Scan for setups and randomly sample 10 of them (compiled, no API calls)
+        arr = self.candles_np
+        (self.setups_found, setup_idx, setup_atr, setup_adx, setup_volume_ratio, setup_layer_price,
+         setup_is_resistance, setup_strength, setup_touches, setup_distance) = scan_setups(
+            arr[:, 2], arr[:, 3], arr[:, 4], arr[:, 5],
+            LOOKBACK_CANDLES, LAYER_THRESHOLD_PCT, MIN_LAYER_STRENGTH,
+            MAX_GROK_CALLS, random.randrange(2 ** 32)
+        )
         
-        for i in range(LOOKBACK_CANDLES, total_candles):
-            window = candles[i - LOOKBACK_CANDLES:i + 1]
-            
-            highs = [c[2] for c in window]
-            lows = [c[3] for c in window]
-            closes = [c[4] for c in window]
-            volumes = [c[5] for c in window]
-            
-            current_price = closes[-1]
-            
-            atr = calculate_atr(highs, lows, closes)
-            adx = calculate_adx(highs, lows, closes)
-            market_status = "RANGE" if is_ranging(adx) else "TREND"
-            volume_ratio = volumes[-1] / (sum(volumes) / len(volumes)) if volumes else 1.0
-            
-            resistance_layers, support_layers = find_layers(
-                highs, lows, closes, volumes,
-                cluster_threshold=0.1,
-                max_layers=4
-            )
-            
-            near_layer = find_nearest_layer(
-                current_price,
-                resistance_layers,
-                support_layers,
-                threshold_pct=LAYER_THRESHOLD_PCT
-            )
-            
-            if not near_layer or near_layer.strength < MIN_LAYER_STRENGTH:
-                continue
-            
-            # Store setup info
-            all_setups.append({
-                'idx': i,
-                'price': current_price,
-                'layer': near_layer,
-                'atr': atr,
-                'adx': adx,
-                'market_status': market_status,
-                'volume_ratio': volume_ratio
-            })
-            
-            if len(all_setups) % 10 == 0:
-                print(f"   Found {len(all_setups)} setups...", end='\r')
+        print(f"   Total setups found: {self.setups_found}")
         
-        self.setups_found = len(all_setups)
-        print(f"\n   Total setups found: {self.setups_found}")
-        
-        # Phase 2: Randomly select 10 setups
-        if len(all_setups) > MAX_GROK_CALLS:
-            selected_setups = random.sample(all_setups, MAX_GROK_CALLS)
-            selected_setups.sort(key=lambda x: x['idx'])  # Sort by time
-        else:
-            selected_setups = all_setups
+        # Only the sampled setups are materialized as Python objects
+        selected_setups = []
+        for k in range(len(setup_idx)):
+            adx = float(setup_adx[k])
+            selected_setups.append(Setup(
+                idx=int(setup_idx[k]),
+                price=float(arr[setup_idx[k], 4]),
+                layer=Layer(
+                    price=float(setup_layer_price[k]),
+                    layer_type='resistance' if setup_is_resistance[k] else 'support',
+                    touches=int(setup_touches[k]),
+                    strength=int(setup_strength[k]),
+                    distance_pct=float(setup_distance[k])
+                ),
+                atr=float(setup_atr[k]),
+                adx=adx,
+                market_status="RANGE" if is_ranging(adx) else "TREND",
+                volume_ratio=float(setup_volume_ratio[k])
+            ))
         
         print(f"\n[Backtest] Phase 2: Analyzing {len(selected_setups)} random setups with Grok...")
         
-        # Phase 3: Call Grok for selected setups
+        # Duplicate setups share one Grok call; the first (earliest) member is sent
+        groups: Dict[Tuple, List[int]] = {}
         for j, setup in enumerate(selected_setups):
-            i = setup['idx']
-            current_price = setup['price']
-            near_layer = setup['layer']
-            atr = setup['atr']
-            adx = setup['adx']
-            market_status = setup['market_status']
-            volume_ratio = setup['volume_ratio']
-            
-            print(f"   Analyzing setup {j+1}/{len(selected_setups)}...", end='\r')
+            groups.setdefault(setup_key(setup), []).append(j)
+        print(f"   Duplicate setups sharing a call: {len(selected_setups) - len(groups)}")
+        
+        # Phase 3: Call Grok once per group (concurrently, in time order)
+        semaphore = asyncio.Semaphore(GROK_CONCURRENCY)
+        cache_hits = self.grok.cache_hits
+        
+        try:
+            group_results = await asyncio.gather(
+                *(self.analyze_setup(selected_setups[members[0]], semaphore) for members in groups.values()),
+                return_exceptions=True
+            )
+        finally:
+            await self.grok.aclose()
+        
+        results = [None] * len(selected_setups)
+        for members, result in zip(groups.values(), group_results):
+            for j in members:
+                results[j] = result
+        
+        # Cached responses are free: only count calls that reached the API
+        cache_hits = self.grok.cache_hits - cache_hits
+        self.grok_calls += len(groups) - cache_hits
+        self.total_cost += GROK_COST_PER_CALL * (len(groups) - cache_hits)
+        print(f"   Grok responses from cache: {cache_hits}")
+        
+        trades = np.empty(len(selected_setups), dtype=TRADE_DTYPE)
+        n_trades = 0
+        
+        for j, (setup, result) in enumerate(zip(selected_setups, results)):
+            if isinstance(result, Exception):
+                print(f"\n   [Error] Setup {j+1}: {result}")
+                continue
             
-            self.grok_calls += 1
-            self.total_cost += GROK_COST_PER_CALL
+            i = setup.idx
+            current_price = setup.price
+            atr = setup.atr
+            direction = result['direction']
+            confidence = result['confidence']
             
-            ohlcv_summary = self.build_ohlcv_summary(candles, i)
+            print(f"   Setup {j+1}: {direction} @ {confidence}% confidence")
             
-            try:
-                result = self.grok.analyze_technical(
-                    price=current_price,
-                    layer_type=near_layer.layer_type,
-                    layer_price=near_layer.price,
-                    layer_distance=near_layer.distance_pct,
-                    layer_strength=f"{near_layer.strength}/3",
-                    layer_touches=near_layer.touches,
-                    ohlcv_summary=ohlcv_summary,
-                    atr_value=atr,
-                    adx_value=adx,
-                    market_status=market_status,
-                    volume_ratio=volume_ratio
-                )
-                
-                direction = result['direction']
-                confidence = result['confidence']
+            if direction != 'SKIP' and confidence >= MIN_CONFIDENCE:
+                tp = result['tp']
+                sl = result['sl']
                 
-                print(f"   Setup {j+1}: {direction} @ {confidence}% confidence")
+                if tp == 0 or sl == 0:
+                    if direction == 'LONG':
+                        tp = current_price + atr
+                        sl = current_price - atr
+                    else:
+                        tp = current_price - atr
+                        sl = current_price + atr
                 
-                if direction != 'SKIP' and confidence >= MIN_CONFIDENCE:
-                    tp = result['tp']
-                    sl = result['sl']
-                    
-                    if tp == 0 or sl == 0:
-                        if direction == 'LONG':
-                            tp = current_price + atr
-                            sl = current_price - atr
-                        else:
-                            tp = current_price - atr
-                            sl = current_price + atr
-                    
-                    trade = BacktestTrade(
-                        entry_idx=i,
-                        entry_price=current_price,
-                        direction=direction,
-                        tp=tp,
-                        sl=sl,
-                        confidence=confidence,
-                        reason=result['reason']
-                    )
-                    
-                    self.trades.append(trade)
-                    
-            except Exception as e:
-                print(f"\n   [Error] Setup {j+1}: {e}")
-                continue
+                trades[n_trades] = (
+                    i, -1, current_price, np.nan, tp, sl, confidence,
+                    DIRECTION_LONG if direction == 'LONG' else DIRECTION_SHORT,
+                    RESULT_OPEN, 0.0, 0.0
+                )
+                self.trade_reasons.append(result['reason'])
+                n_trades += 1
+        
+        self.trades = trades[:n_trades]
         
         print(f"\n\n[Backtest] Phase 3: Checking trade outcomes...")
         
-        for trade in self.trades:
-            self.check_trade_outcome(trade, candles)
+        for k in range(len(self.trades)):
+            self.check_trade_outcome(k)
         
-        return self.generate_report(candles)
+        return self.generate_report()
     
-    def generate_report(self, candles: List[List]) -> Dict:
+    def generate_report(self) -> Dict:
         """Generate backtest report."""
         # Calculate statistics
-        wins = [t for t in self.trades if t.result == 'WIN']
-        losses = [t for t in self.trades if t.result == 'LOSS']
-        open_trades = [t for t in self.trades if t.result == 'OPEN']
+        result = self.trades['result']
+        pnl_percent = self.trades['pnl_percent']
+        win_pnl = pnl_percent[result == RESULT_WIN]
+        loss_pnl = pnl_percent[result == RESULT_LOSS]
+        n_wins = len(win_pnl)
+        n_losses = len(loss_pnl)
+        n_open = int((result == RESULT_OPEN).sum())
         
-        total_trades = len(wins) + len(losses)
-        win_rate = (len(wins) / total_trades * 100) if total_trades > 0 else 0
+        total_trades = n_wins + n_losses
+        win_rate = (n_wins / total_trades * 100) if total_trades > 0 else 0
         
-        total_pnl_usd = sum(t.pnl_usd for t in self.trades)
-        total_pnl_percent = sum(t.pnl_percent for t in self.trades)
+        total_pnl_usd = float(self.trades['pnl_usd'].sum())
+        total_pnl_percent = float(pnl_percent.sum())
         
         # Calculate average R:R
-        avg_win = sum(t.pnl_percent for t in wins) / len(wins) if wins else 0
-        avg_loss = abs(sum(t.pnl_percent for t in losses) / len(losses)) if losses else 1
+        avg_win = float(win_pnl.mean()) if n_wins else 0
+        avg_loss = abs(float(loss_pnl.mean())) if n_losses else 1
         avg_rr = avg_win / avg_loss if avg_loss > 0 else 0
         
         # Time range
-        start_time = datetime.fromtimestamp(candles[0][0] / 1000)
-        end_time = datetime.fromtimestamp(candles[-1][0] / 1000)
+        start_time = datetime.fromtimestamp(self.timestamps[0] / 1000, tz=timezone.utc)
+        end_time = datetime.fromtimestamp(self.timestamps[-1] / 1000, tz=timezone.utc)
         
         # Print report
         print("\n" + "=" * 60)
@@ -372,15 +588,15 @@ class Backtester:
         print(f"Symbol: {SYMBOL}")
         print(f"Timeframe: {TIMEFRAME}")
         print("-" * 60)
-        print(f"Candles Analyzed: {len(candles)}")
+        print(f"Candles Analyzed: {len(self.timestamps)}")
         print(f"Setups Found (price near layer): {self.setups_found}")
         print(f"Grok API Calls: {self.grok_calls}")
         print(f"API Cost: ${self.total_cost:.4f}")
         print("-" * 60)
         print(f"Trades Taken (confidence >= {MIN_CONFIDENCE}%): {len(self.trades)}")
-        print(f"  - Wins: {len(wins)}")
-        print(f"  - Losses: {len(losses)}")
-        print(f"  - Still Open: {len(open_trades)}")
+        print(f"  - Wins: {n_wins}")
+        print(f"  - Losses: {n_losses}")
+        print(f"  - Still Open: {n_open}")
         print("-" * 60)
         if total_trades > 0:
             print(f"Win Rate: {win_rate:.1f}%")
@@ -394,55 +610,59 @@ class Backtester:
         print("=" * 60)
         
         # Save detailed trade log
-        self.save_trade_log(candles)
+        self.save_trade_log()
         
         return {
             'period_start': start_time.isoformat(),
             'period_end': end_time.isoformat(),
-            'candles_analyzed': len(candles),
+            'candles_analyzed': len(self.timestamps),
             'setups_found': self.setups_found,
             'grok_calls': self.grok_calls,
             'api_cost': self.total_cost,
             'total_trades': len(self.trades),
-            'wins': len(wins),
-            'losses': len(losses),
-            'open': len(open_trades),
+            'wins': n_wins,
+            'losses': n_losses,
+            'open': n_open,
             'win_rate': win_rate,
             'avg_rr': avg_rr,
             'total_pnl_percent': total_pnl_percent,
             'total_pnl_usd': total_pnl_usd
         }
     
-    def save_trade_log(self, candles: List[List]) -> None:
+    def save_trade_log(self) -> None:
         """Save detailed trade log to CSV."""
         os.makedirs('logs', exist_ok=True)
         log_file = 'logs/backtest_results.csv'
         
+        trades = self.trades
+        entry_times = format_timestamps(self.timestamps[trades['entry_idx']])
+        exit_times = format_timestamps(self.timestamps[np.maximum(trades['exit_idx'], 0)])
+        
+        rows = [[
+            entry_times[k],
+            exit_times[k] if trade['exit_idx'] >= 0 else 'N/A',
+            'LONG' if trade['direction'] == DIRECTION_LONG else 'SHORT',
+            f"{trade['entry_price']:.8f}",
+            f"{trade['tp']:.8f}",
+            f"{trade['sl']:.8f}",
+            f"{trade['exit_price']:.8f}" if trade['exit_idx'] >= 0 else 'N/A',
+            trade['confidence'],
+            RESULT_LABELS[trade['result']],
+            f"{trade['pnl_percent']:.2f}",
+            f"{trade['pnl_usd']:.2f}",
+            reason
+        ] for k, (trade, reason) in enumerate(zip(trades, self.trade_reasons))]
+        
+        # Build the whole table in memory and write it with a single call
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow([
+            'Entry Time', 'Exit Time', 'Direction', 'Entry Price', 'TP', 'SL',
+            'Exit Price', 'Confidence', 'Result', 'P&L %', 'P&L USD', 'Reason'
+        ])
+        writer.writerows(rows)
         with open(log_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'Entry Time', 'Exit Time', 'Direction', 'Entry Price', 'TP', 'SL',
-                'Exit Price', 'Confidence', 'Result', 'P&L %', 'P&L USD', 'Reason'
-            ])
-            
-            for trade in self.trades:
-                entry_time = datetime.fromtimestamp(candles[trade.entry_idx][0] / 1000).strftime('%Y-%m-%d %H:%M')
-                exit_time = datetime.fromtimestamp(candles[trade.exit_idx][0] / 1000).strftime('%Y-%m-%d %H:%M') if trade.exit_idx else 'N/A'
-                
-                writer.writerow([
-                    entry_time,
-                    exit_time,
-                    trade.direction,
-                    f"{trade.entry_price:.8f}",
-                    f"{trade.tp:.8f}",
-                    f"{trade.sl:.8f}",
-                    f"{trade.exit_price:.8f}" if trade.exit_price else 'N/A',
-                    trade.confidence,
-                    trade.result,
-                    f"{trade.pnl_percent:.2f}",
-                    f"{trade.pnl_usd:.2f}",
-                    trade.reason
-                ])
+            f.write(buf.getvalue())
         
         print(f"\n[Backtest] Trade log saved to: {log_file}")
 
@@ -455,4 +675,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
@@ -1 +1,9 @@
 # PEPE Scalping Bot
+import os
+
+# Keep compiled numba kernels in one repo-level cache shared by every entry point.
+# Numba reads this when it is first imported, so it must be set before that.
+os.environ.setdefault(
+    "NUMBA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".numba_cache")
+)
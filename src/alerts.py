@@ -2,15 +2,37 @@
 Telegram alerts module for sending trade signals.
 """
 import os
+import time
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+from telegram.request import HTTPXRequest
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Connection pool / retry settings
+CONNECTION_POOL_SIZE = 8
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 10.0
+SEND_RETRIES = 4
+MAX_BACKOFF = 30
+
+_stamp_second = None
+_stamp_text = ""
+
+
+def utc_stamp() -> str:
+    """Current UTC time as 'YYYY-MM-DD HH:MM:SS', formatted at most once per second."""
+    global _stamp_second, _stamp_text
+    second = int(time.time())
+    if second != _stamp_second:
+        _stamp_second = second
+        _stamp_text = datetime.fromtimestamp(second, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return _stamp_text
+
 
 class TelegramAlert:
     """Handles Telegram notifications."""
@@ -23,20 +45,45 @@ class TelegramAlert:
         if not self.token or not self.chat_id:
             raise ValueError("TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID not found")
 
-        self.bot = Bot(token=self.token)
+        # One pooled HTTPS client for every alert, so only the first send pays the TLS handshake
+        request = HTTPXRequest(
+            connection_pool_size=CONNECTION_POOL_SIZE,
+            connect_timeout=CONNECT_TIMEOUT,
+            read_timeout=READ_TIMEOUT
+        )
+        self.bot = Bot(token=self.token, request=request)
 
     async def send_message(self, message: str) -> bool:
-        """Send a message to Telegram."""
-        try:
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode='HTML'
-            )
-            return True
-        except TelegramError as e:
-            print(f"[Telegram] Error sending message: {e}")
-            return False
+        """Send a message to Telegram, retrying transient network errors with backoff."""
+        for attempt in range(SEND_RETRIES):
+            try:
+                await self.bot.send_message(
+                    chat_id=self.chat_id,
+                    text=message,
+                    parse_mode='HTML'
+                )
+                return True
+            except RetryAfter as e:
+                # Flood control: Telegram says exactly how long to wait
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+            except BadRequest as e:
+                # Malformed message, retrying won't help
+                print(f"[Telegram] Error sending message: {e}")
+                return False
+            except NetworkError as e:
+                delay = min(2 ** attempt, MAX_BACKOFF)
+                print(f"[Telegram] Network error (attempt {attempt + 1}/{SEND_RETRIES}): {e}")
+            except TelegramError as e:
+                print(f"[Telegram] Error sending message: {e}")
+                return False
+
+            if attempt < SEND_RETRIES - 1:
+                await asyncio.sleep(delay)
+
+        print(f"[Telegram] Giving up after {SEND_RETRIES} attempts")
+        return False
 
     async def send_high_confidence_alert(
             self,
@@ -74,7 +121,7 @@ class TelegramAlert:
 • Confidence: {confidence}% (technical)
 • Reason: {reason}
 
-⏱ {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"""
+⏱ {utc_stamp()} UTC"""
 
         await self.send_message(message)
 
@@ -121,7 +168,7 @@ class TelegramAlert:
 • Whale Alert: {whale_str}
 • Reason: {reason}
 
-⏱ {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"""
+⏱ {utc_stamp()} UTC"""
 
         await self.send_message(message)
 
@@ -131,7 +178,7 @@ class TelegramAlert:
 Confidence: {confidence}%
 Reason: {reason}
 
-⏱ {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"""
+⏱ {utc_stamp()} UTC"""
 
         await self.send_message(message)
 
@@ -146,7 +193,7 @@ Max Risk: 0.2% per trade
 
 Bot is now watching for bounce layer setups...
 
-⏱ """ + datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S') + " UTC"
+⏱ """ + utc_stamp() + " UTC"
 
         await self.send_message(message)
 
@@ -156,7 +203,7 @@ Bot is now watching for bounce layer setups...
 
 {error}
 
-⏱ {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"""
+⏱ {utc_stamp()} UTC"""
 
         await self.send_message(message)
 
@@ -6,19 +6,26 @@ Usage:
     python -m src.backtest                  # Full backtest with Grok analysis
     python -m src.backtest --scan-only      # Only scan for setups, no Grok API calls
     python -m src.backtest --days 5         # Backtest last 5 days
+    python -m src.backtest --no-cache       # Always call the Grok API (skip the response cache)
 """
 import asyncio
-import ccxt
+import ccxt.async_support as ccxt
 import os
-import csv
 import sys
+from operator import attrgetter
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from dotenv import load_dotenv
 
-from src.layers import find_layers, find_nearest_layer, format_layer_for_prompt
-from src.utils import calculate_atr, calculate_adx, is_ranging
+import numpy as np
+import pandas as pd
+
+from src.layers import rolling_nearest_layer_kernel
+from src.utils import (
+    compute_atr_series, compute_adx_series, compute_volume_ratio_series,
+    run_async, ThrottledPrinter
+)
 
 load_dotenv()
 
@@ -26,6 +33,9 @@ load_dotenv()
 SYMBOL = "1000PEPE/USDT:USDT"
 TIMEFRAME = "1m"
 LOOKBACK_CANDLES = 60  # Candles needed for indicator calculation
+OHLCV_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+FETCH_LIMIT = 499  # Candles per request: Binance Futures weight 2 (vs 10 at 1500)
+FETCH_CONCURRENCY = 4  # Parallel fetch_ohlcv requests
 
 # Setup filtering (tuned to reduce noise)
 LAYER_THRESHOLD_PCT = 0.4  # Increased from 0.1% to 0.4% - meaningful approaches only
@@ -33,9 +43,14 @@ MIN_LAYER_TOUCHES = 2      # Minimum touches for layer validity
 MIN_LAYER_STRENGTH = 2     # Minimum strength (2/3 or 3/3)
 MIN_VOLUME_RATIO = 1.2     # Above average volume required
 MIN_ADX = 20               # Filter pure ranging noise
+RANGING_ADX = 25.0         # ADX below this is RANGE (is_ranging's default threshold)
 
 # Batch settings
 MAX_CONCURRENT_REQUESTS = 10  # Max parallel Grok API calls
+GROK_BATCH_SIZE = 8           # Setups packed into one Grok request
+MAX_REQUESTS_PER_SECOND = 10  # Grok API call rate (token bucket, bursts up to MAX_CONCURRENT_REQUESTS)
+CACHE_DIR = "cache"  # Parquet candle cache
+GROK_CACHE_DIR = os.path.join(CACHE_DIR, "grok")  # Grok responses by prompt hash (shared with backtest.py)
 
 
 @dataclass
@@ -52,7 +67,8 @@ class BacktestSetup:
     adx: float
     market_status: str
     volume_ratio: float
-    ohlcv_summary: str
+    candle_idx: int  # Index of the setup's candle in the fetched history
+    ohlcv_summary: Optional[str] = None  # Grok prompt candles, built only when analyzed
     # Grok analysis results (filled after API call)
     direction: str = ""
     confidence: int = 0
@@ -61,32 +77,100 @@ class BacktestSetup:
     reason: str = ""
 
 
+CSV_WRITE_BUFFER = 1 << 20  # Bytes
+
+# Saved columns: every field except the candle index and the large prompt summary;
+# the scan file stops before the Grok results
+RESULT_COLUMNS = [f.name for f in fields(BacktestSetup) if f.name not in ('candle_idx', 'ohlcv_summary')]
+SCAN_COLUMNS = RESULT_COLUMNS[:RESULT_COLUMNS.index('volume_ratio') + 1]
+
+
+def format_local_timestamps(ts_ms: np.ndarray) -> np.ndarray:
+    """
+    Format millisecond timestamps as local-time 'YYYY-MM-DDTHH:MM:SS' in one vectorized pass.
+
+    Matches datetime.fromtimestamp(ts / 1000).isoformat() for whole-second timestamps; the
+    UTC offset is looked up once per hour, since DST changes fall on hour boundaries.
+    """
+    if len(ts_ms) == 0:
+        return np.empty(0, dtype='<U19')
+    hours = ts_ms // 3_600_000
+    unique_hours, inverse = np.unique(hours, return_inverse=True)
+    offsets_ms = np.array([
+        datetime.fromtimestamp(h * 3600).astimezone().utcoffset().total_seconds() * 1000
+        for h in unique_hours.tolist()
+    ], dtype=np.int64)
+    local = (ts_ms + offsets_ms[inverse]).astype('datetime64[ms]')
+    return np.datetime_as_string(local, unit='s')
+
+
+def missing_ranges(ts_ms: np.ndarray, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+    """
+    Candle ranges [from, to) inside [start_ts, end_ts] that sorted cached timestamps don't cover:
+    the head before the first cached candle, every interior jump of more than one minute,
+    and the tail after the last one (up to the forming candle).
+    """
+    first = -(-start_ts // 60000) * 60000  # First candle open at or after start_ts
+    ts = ts_ms[(ts_ms >= first) & (ts_ms <= end_ts)].astype(np.int64)
+    if not len(ts):
+        return [(first, end_ts + 1)]
+
+    ranges = []
+    if ts[0] > first:
+        ranges.append((first, int(ts[0])))
+    jumps = np.flatnonzero(np.diff(ts) > 60000)
+    ranges.extend((int(ts[i]) + 60000, int(ts[i + 1])) for i in jumps.tolist())
+    if ts[-1] + 60000 <= end_ts:
+        ranges.append((int(ts[-1]) + 60000, end_ts + 1))
+    return ranges
+
+
+def setup_key(setup: BacktestSetup) -> Tuple:
+    """Coarse feature key for a setup: setups sharing a key get the same Grok verdict."""
+    return (
+        round(setup.layer_price, 6), setup.layer_type,
+        round(setup.adx / 5) * 5, round(setup.volume_ratio, 1)
+    )
+
+
 class Backtester:
     """Backtesting engine with async Grok analysis."""
 
-    def __init__(self, scan_only: bool = False):
-        self.exchange = ccxt.binance({
-            'enableRateLimit': True,
-            'options': {'defaultType': 'swap'}
-        })
+    def __init__(self, scan_only: bool = False, use_cache: bool = True):
         self.scan_only = scan_only
         self.grok = None
         if not scan_only:
             from src.grok import GrokClient
-            self.grok = GrokClient()
-        self.setups: List[BacktestSetup] = []
+            self.grok = GrokClient(
+                cache_dir=GROK_CACHE_DIR if use_cache else None,
+                max_connections=MAX_CONCURRENT_REQUESTS,
+                requests_per_second=MAX_REQUESTS_PER_SECOND
+            )
+        self.candles: Optional[Dict[str, np.ndarray]] = None  # Set by run()
+        self.progress = ThrottledPrinter()  # Grok analysis progress line
+        self.analyzed_count = 0
+        self.analyze_total = 0
         self.results_dir = "backtest_results"
         os.makedirs(self.results_dir, exist_ok=True)
 
-    def fetch_historical_data(self, days: int = 3) -> List[Dict]:
+    def candle_cache_path(self) -> str:
+        """Parquet cache of closed candles for SYMBOL/TIMEFRAME."""
+        symbol = SYMBOL.replace('/', '').replace(':', '_')
+        return os.path.join(CACHE_DIR, f"{symbol}_{TIMEFRAME}.parquet")
+
+    async def fetch_historical_data(self, days: int = 3) -> Dict[str, np.ndarray]:
         """
         Fetch historical 1m candles from Binance.
 
+        Closed candles are kept in a local Parquet cache; only the ranges inside the requested
+        window that the cache doesn't cover (head, interior gaps, tail) are downloaded.
+
         Args:
             days: Number of days to fetch
 
         Returns:
-            List of candle dicts
+            Dict of column arrays keyed by OHLCV_COLUMNS (int64 ms timestamps, float64 prices/volume)
+            plus 'datetime' (local-time ISO strings)
         """
         print(f"[Backtest] Fetching {days} days of historical data...")
 
@@ -94,298 +178,334 @@ class Backtester:
         end_time = datetime.now()
         start_time = end_time - timedelta(days=days)
 
-        all_candles = []
-        since = int(start_time.timestamp() * 1000)
+        start_ts = int(start_time.timestamp() * 1000)
         end_ts = int(end_time.timestamp() * 1000)
 
-        # Binance limits to 1500 candles per request
-        while True:
-            print(f"[Backtest] Fetching from {datetime.fromtimestamp(since/1000).isoformat()}...")
+        cache_path = self.candle_cache_path()
+        cached = np.empty((0, 6))
+        if os.path.exists(cache_path):
+            cached = pd.read_parquet(cache_path, columns=list(OHLCV_COLUMNS)).to_numpy(dtype=np.float64)
 
-            ohlcv = self.exchange.fetch_ohlcv(
-                SYMBOL,
-                TIMEFRAME,
-                since=since,
-                limit=1500
-            )
+        gaps = missing_ranges(cached[:, 0], start_ts, end_ts)
+        print(f"[Backtest] Cached candles: {len(cached)}, missing ranges to fetch: {len(gaps)}")
+
+        # (since, limit) pages, each capped at the end of its range
+        pages = [
+            (since, min(FETCH_LIMIT, -(-(range_end - since) // 60000)))
+            for range_start, range_end in gaps
+            for since in range(range_start, range_end, FETCH_LIMIT * 60000)
+        ]
+        fetched = await self.fetch_pages(pages)
+        rows = np.concatenate([cached, fetched])
+
+        # Pages can overlap each other and the cache: dedupe on timestamp, keep time order
+        _, first = np.unique(rows[:, 0], return_index=True)
+        rows = rows[first]
+
+        # Only closed candles are immutable, so only those are persisted
+        if len(fetched):
+            closed = rows[rows[:, 0] + 60000 <= end_ts]
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            df = pd.DataFrame(closed, columns=list(OHLCV_COLUMNS)).astype({'timestamp': np.int64})
+            tmp_path = cache_path + '.tmp'
+            df.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+            os.replace(tmp_path, cache_path)
+
+        rows = rows[(rows[:, 0] >= start_ts) & (rows[:, 0] <= end_ts)]
+
+        # Whatever is still missing was not returned by the exchange (e.g. maintenance windows)
+        unfilled = missing_ranges(rows[:, 0], start_ts, end_ts)
+        if unfilled:
+            minutes = sum((range_end - range_start) // 60000 for range_start, range_end in unfilled)
+            print(f"[Backtest] WARNING: {len(unfilled)} gap(s) in the candle history ({minutes} minutes missing)")
+
+        candles = {name: np.ascontiguousarray(rows[:, k]) for k, name in enumerate(OHLCV_COLUMNS)}
+        candles['timestamp'] = candles['timestamp'].astype(np.int64)
+        candles['datetime'] = format_local_timestamps(candles['timestamp'])
+
+        print(f"[Backtest] Loaded {len(rows)} candles ({len(fetched)} fetched)")
+        return candles
+
+    async def fetch_pages(self, pages: List[Tuple[int, int]]) -> np.ndarray:
+        """
+        Fetch (since, limit) candle pages from Binance concurrently.
+
+        Returns: (N, 6) float64 array of [timestamp, open, high, low, close, volume]
+        """
+        if not pages:
+            return np.empty((0, 6))
+
+        exchange = ccxt.binance({
+            'enableRateLimit': True,
+            'options': {'defaultType': 'swap', 'fetchOHLCVLimit': FETCH_LIMIT}
+        })
 
-            if not ohlcv:
-                break
-
-            for candle in ohlcv:
-                all_candles.append({
-                    'timestamp': candle[0],
-                    'datetime': datetime.fromtimestamp(candle[0] / 1000).isoformat(),
-                    'open': candle[1],
-                    'high': candle[2],
-                    'low': candle[3],
-                    'close': candle[4],
-                    'volume': candle[5]
-                })
-
-            # Move to next batch
-            since = ohlcv[-1][0] + 60000  # +1 minute
-
-            # Check if we've reached current time
-            if since >= end_ts:
-                break
-
-            # Small delay to respect rate limits (sync sleep)
-            import time
-            time.sleep(0.1)
-
-        print(f"[Backtest] Fetched {len(all_candles)} candles")
-        return all_candles
-
-    def get_ohlcv_lists(self, candles: List[Dict]) -> Tuple[List, List, List, List, List]:
-        """Extract OHLCV as separate lists."""
-        opens = [c['open'] for c in candles]
-        highs = [c['high'] for c in candles]
-        lows = [c['low'] for c in candles]
-        closes = [c['close'] for c in candles]
-        volumes = [c['volume'] for c in candles]
-        return opens, highs, lows, closes, volumes
-
-    def get_candles_summary(self, candles: List[Dict]) -> str:
-        """Get summary of last 10 candles for AI prompt."""
-        recent = candles[-10:]
-        summary_lines = []
-
-        for c in recent:
-            change = ((c['close'] - c['open']) / c['open']) * 100
-            direction = "+" if change >= 0 else ""
-            summary_lines.append(
-                f"{c['datetime'][-8:]}: O={c['open']:.8f} H={c['high']:.8f} L={c['low']:.8f} C={c['close']:.8f} ({direction}{change:.2f}%)"
+        try:
+            # Small pages are cheaper in API weight; ccxt's rate limiter still paces
+            # the requests that get past the semaphore
+            semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+            progress = ThrottledPrinter()
+
+            async def fetch_page(since: int, limit: int) -> List[List]:
+                async with semaphore:
+                    progress(f"[Backtest] Fetching from {datetime.fromtimestamp(since/1000).isoformat()}...")
+                    return await exchange.fetch_ohlcv(
+                        SYMBOL,
+                        TIMEFRAME,
+                        since=since,
+                        limit=limit
+                    )
+
+            results = await asyncio.gather(*(fetch_page(since, limit) for since, limit in pages))
+        finally:
+            await exchange.close()
+
+        return np.asarray([candle for page in results for candle in page], dtype=np.float64).reshape(-1, 6)
+
+    def get_candles_summary(self, candles: Dict[str, np.ndarray], end: int) -> str:
+        """Get summary of the 10 candles up to and including `end` for AI prompt."""
+        start = max(0, end - 9)
+        opens = candles['open'][start:end + 1]
+        highs = candles['high'][start:end + 1]
+        lows = candles['low'][start:end + 1]
+        closes = candles['close'][start:end + 1]
+        changes = (closes - opens) / opens * 100
+
+        return "\n".join(
+            f"{dt[-8:]}: O={o:.8f} H={h:.8f} L={l:.8f} C={c:.8f} ({change:+.2f}%)"
+            for dt, o, h, l, c, change in zip(
+                candles['datetime'][start:end + 1].tolist(), opens.tolist(), highs.tolist(),
+                lows.tolist(), closes.tolist(), changes.tolist()
             )
+        )
+
+    def _precompute_indicators(self, candles: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Compute full-length indicator series over the candle columns in one pass.
+
+        ATR/ADX (Wilder) and the volume ratio are causal, so the value at bar i is
+        read straight from these series instead of recomputing each window.
+
+        Args:
+            candles: Candle columns from fetch_historical_data
+
+        Returns:
+            Dict of arrays: atr, adx, volume_ratio
+        """
+        highs, lows, closes = candles['high'], candles['low'], candles['close']
 
-        return "\n".join(summary_lines)
+        return {
+            'atr': compute_atr_series(highs, lows, closes, 14),
+            'adx': compute_adx_series(highs, lows, closes, 14),
+            # Same (LOOKBACK_CANDLES + 1)-bar window the layer detection sees
+            'volume_ratio': compute_volume_ratio_series(candles['volume'], LOOKBACK_CANDLES + 1),
+        }
 
-    def find_setups(self, candles: List[Dict]) -> List[BacktestSetup]:
+    def find_setups(self, candles: Dict[str, np.ndarray]) -> pd.DataFrame:
         """
         Scan historical data and find all potential trade setups.
         Applies filtering to reduce noise and focus on high-probability setups.
 
         Args:
-            candles: List of historical candles
+            candles: Candle columns from fetch_historical_data
 
         Returns:
-            List of BacktestSetup objects
+            DataFrame with one row per setup (BacktestSetup fields up to candle_idx)
         """
         print(f"[Backtest] Scanning for setups...")
         print(f"[Backtest] Filters: distance<={LAYER_THRESHOLD_PCT}%, touches>={MIN_LAYER_TOUCHES}, strength>={MIN_LAYER_STRENGTH}, volume>={MIN_VOLUME_RATIO}x, ADX>={MIN_ADX}")
-        setups = []
         filtered_stats = {'adx': 0, 'volume': 0, 'touches': 0, 'strength': 0}
 
-        # We need at least LOOKBACK_CANDLES for indicators
-        for i in range(LOOKBACK_CANDLES, len(candles)):
-            # Get window of candles
-            window = candles[i - LOOKBACK_CANDLES:i + 1]
-            opens, highs, lows, closes, volumes = self.get_ohlcv_lists(window)
-
-            current_price = closes[-1]
-            current_candle = candles[i]
-
-            # Calculate indicators
-            atr = calculate_atr(highs, lows, closes)
-            adx = calculate_adx(highs, lows, closes)
-            market_status = "RANGE" if is_ranging(adx) else "TREND"
-            volume_ratio = volumes[-1] / (sum(volumes) / len(volumes)) if volumes else 1.0
-
-            # Filter 1: ADX threshold (skip pure noise)
-            if adx < MIN_ADX:
-                filtered_stats['adx'] += 1
-                continue
-
-            # Filter 2: Volume ratio (need above average volume)
-            if volume_ratio < MIN_VOLUME_RATIO:
-                filtered_stats['volume'] += 1
-                continue
-
-            # Find layers
-            resistance_layers, support_layers = find_layers(
-                highs, lows, closes, volumes,
-                cluster_threshold=0.1,
-                max_layers=4
-            )
-
-            # Check if price is near any layer
-            near_layer = find_nearest_layer(
-                current_price,
-                resistance_layers,
-                support_layers,
-                threshold_pct=LAYER_THRESHOLD_PCT
-            )
-
-            if near_layer:
-                # Filter 3: Minimum layer touches
-                if near_layer.touches < MIN_LAYER_TOUCHES:
-                    filtered_stats['touches'] += 1
-                    continue
-
-                # Filter 4: Minimum layer strength
-                if near_layer.strength < MIN_LAYER_STRENGTH:
-                    filtered_stats['strength'] += 1
-                    continue
-
-                setup = BacktestSetup(
-                    timestamp=current_candle['datetime'],
-                    price=current_price,
-                    layer_type=near_layer.layer_type,
-                    layer_price=near_layer.price,
-                    layer_distance=near_layer.distance_pct,
-                    layer_strength=near_layer.strength,
-                    layer_touches=near_layer.touches,
-                    atr=atr,
-                    adx=adx,
-                    market_status=market_status,
-                    volume_ratio=volume_ratio,
-                    ohlcv_summary=self.get_candles_summary(window)
-                )
-                setups.append(setup)
+        ind = self._precompute_indicators(candles)
+        highs, lows, closes, volumes = candles['high'], candles['low'], candles['close'], candles['volume']
+        atr_arr, adx_arr, volume_ratio_arr = ind['atr'], ind['adx'], ind['volume_ratio']
+
+        # Filters 1-2 as masks over every bar with a full lookback window
+        # (ADX first, then volume among the ADX survivors)
+        scanned = np.arange(len(closes)) >= LOOKBACK_CANDLES
+        adx_ok = scanned & (adx_arr >= MIN_ADX)
+        volume_ok = adx_ok & (volume_ratio_arr >= MIN_VOLUME_RATIO)
+        filtered_stats['adx'] = int(scanned.sum() - adx_ok.sum())
+        filtered_stats['volume'] = int(adx_ok.sum() - volume_ok.sum())
+
+        # Nearest layer of every window in one rolling pass: swings are found once and
+        # clusters are rebuilt only when a swing enters or leaves the window
+        near_price, near_is_res, near_strength, near_touches, near_dist = rolling_nearest_layer_kernel(
+            highs, lows, closes, volumes, LOOKBACK_CANDLES + 1, LAYER_THRESHOLD_PCT, 0.1, 4
+        )
+
+        # Filters 3-4 as masks over the bars near a layer (touches first, then strength)
+        near_ok = volume_ok & ~np.isnan(near_price)
+        touches_ok = near_ok & (near_touches >= MIN_LAYER_TOUCHES)
+        strength_ok = touches_ok & (near_strength >= MIN_LAYER_STRENGTH)
+        filtered_stats['touches'] = int(near_ok.sum() - touches_ok.sum())
+        filtered_stats['strength'] = int(touches_ok.sum() - strength_ok.sum())
+
+        # Setups as columns of the bars that pass every filter (no per-setup objects)
+        idx = np.flatnonzero(strength_ok)
+        setups = pd.DataFrame({
+            'timestamp': candles['datetime'][idx],
+            'price': closes[idx],
+            'layer_type': np.where(near_is_res[idx], 'resistance', 'support'),
+            'layer_price': near_price[idx],
+            'layer_distance': near_dist[idx],
+            'layer_strength': near_strength[idx],
+            'layer_touches': near_touches[idx],
+            'atr': atr_arr[idx],
+            'adx': adx_arr[idx],
+            'market_status': np.where(adx_arr[idx] < RANGING_ADX, 'RANGE', 'TREND'),
+            'volume_ratio': volume_ratio_arr[idx],
+            'candle_idx': idx,
+        })
 
         print(f"[Backtest] Found {len(setups)} potential setups")
         print(f"[Backtest] Filtered out: ADX={filtered_stats['adx']}, Volume={filtered_stats['volume']}, Touches={filtered_stats['touches']}, Strength={filtered_stats['strength']}")
         return setups
 
-    async def analyze_setup_async(self, setup: BacktestSetup, semaphore: asyncio.Semaphore) -> BacktestSetup:
+    async def analyze_batch_async(self, batch: List[BacktestSetup], semaphore: asyncio.Semaphore) -> List[BacktestSetup]:
         """
-        Analyze a single setup with Grok API (async with semaphore for concurrency control).
+        Analyze a batch of setups with one Grok API call (async with semaphore for concurrency control).
         """
+        for setup in batch:
+            if setup.ohlcv_summary is None:
+                setup.ohlcv_summary = self.get_candles_summary(self.candles, setup.candle_idx)
+
         async with semaphore:
             try:
-                # Run synchronous Grok call in executor to not block
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None,
-                    lambda: self.grok.analyze_technical(
-                        price=setup.price,
-                        layer_type=setup.layer_type,
-                        layer_price=setup.layer_price,
-                        layer_distance=setup.layer_distance,
-                        layer_strength=f"{setup.layer_strength}/3",
-                        layer_touches=setup.layer_touches,
-                        ohlcv_summary=setup.ohlcv_summary,
-                        atr_value=setup.atr,
-                        adx_value=setup.adx,
-                        market_status=setup.market_status,
-                        volume_ratio=setup.volume_ratio
-                    )
-                )
-
-                setup.direction = result['direction']
-                setup.confidence = result['confidence']
-                setup.tp = result['tp']
-                setup.sl = result['sl']
-                setup.reason = result['reason']
-
-                print(f"[Backtest] {setup.timestamp}: {setup.direction} ({setup.confidence}%)")
+                results = await self.grok.analyze_technical_batch_async([
+                    {
+                        'price': setup.price,
+                        'layer_type': setup.layer_type,
+                        'layer_price': setup.layer_price,
+                        'layer_distance': setup.layer_distance,
+                        'layer_strength': f"{setup.layer_strength}/3",
+                        'layer_touches': setup.layer_touches,
+                        'ohlcv_summary': setup.ohlcv_summary,
+                        'atr_value': setup.atr,
+                        'adx_value': setup.adx,
+                        'market_status': setup.market_status,
+                        'volume_ratio': setup.volume_ratio
+                    }
+                    for setup in batch
+                ])
+
+                for setup, result in zip(batch, results):
+                    setup.direction = result['direction']
+                    setup.confidence = result['confidence']
+                    setup.tp = result['tp']
+                    setup.sl = result['sl']
+                    setup.reason = result['reason']
 
             except Exception as e:
-                print(f"[Backtest] Error analyzing {setup.timestamp}: {e}")
-                setup.direction = "ERROR"
-                setup.reason = str(e)
+                print(f"[Backtest] Error analyzing batch from {batch[0].timestamp}: {e}")
+                for setup in batch:
+                    setup.direction = "ERROR"
+                    setup.reason = str(e)
 
-            return setup
+        # One progress line per finished batch (rate-limited), not one print per setup
+        self.analyzed_count += len(batch)
+        self.progress(f"[Backtest] Analyzed {self.analyzed_count}/{self.analyze_total} setups",
+                      force=self.analyzed_count == self.analyze_total)
+        return batch
 
     async def analyze_all_setups_async(self, setups: List[BacktestSetup]) -> List[BacktestSetup]:
         """
-        Analyze all setups with concurrent async Grok API calls.
+        Analyze all setups with concurrent async Grok API calls, GROK_BATCH_SIZE setups per call.
+        Near-duplicate setups (same setup_key) are analyzed once and share the result.
         No cooldown - maximum throughput.
         """
-        print(f"[Backtest] Analyzing {len(setups)} setups with {MAX_CONCURRENT_REQUESTS} concurrent requests...")
+        groups: Dict[Tuple, List[BacktestSetup]] = {}
+        for setup in setups:
+            groups.setdefault(setup_key(setup), []).append(setup)
+        unique = [members[0] for members in groups.values()]
+
+        batches = [unique[k:k + GROK_BATCH_SIZE] for k in range(0, len(unique), GROK_BATCH_SIZE)]
+        self.analyzed_count = 0
+        self.analyze_total = len(unique)
+        print(f"[Backtest] Analyzing {len(unique)} unique of {len(setups)} setups in {len(batches)} requests ({MAX_CONCURRENT_REQUESTS} concurrent)...")
 
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
         tasks = [
-            self.analyze_setup_async(setup, semaphore)
-            for setup in setups
+            self.analyze_batch_async(batch, semaphore)
+            for batch in batches
         ]
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Filter out exceptions
-        analyzed = []
+        analyzed = set()
         for r in results:
-            if isinstance(r, BacktestSetup):
-                analyzed.append(r)
+            if isinstance(r, list):
+                analyzed.update(id(setup) for setup in r)
             else:
                 print(f"[Backtest] Task exception: {r}")
 
-        return analyzed
-
-    def save_setups_pre_grok(self, setups: List[BacktestSetup], filename: str = None):
+        # Expand back to every setup (in time order), copying the group's result
+        expanded = []
+        for setup in setups:
+            first = groups[setup_key(setup)][0]
+            if id(first) not in analyzed:
+                continue
+            if setup is not first:
+                setup.direction = first.direction
+                setup.confidence = first.confidence
+                setup.tp = first.tp
+                setup.sl = first.sl
+                setup.reason = first.reason
+            expanded.append(setup)
+
+        return expanded
+
+    def _setups_frame(self, setups: List[BacktestSetup], columns: List[str]) -> pd.DataFrame:
+        """Build a DataFrame of the given BacktestSetup fields in one pass."""
+        get_row = attrgetter(*columns)
+        return pd.DataFrame.from_records([get_row(s) for s in setups], columns=columns)
+
+    def _write_frame(self, df: pd.DataFrame, filepath: str):
+        """Write a results table as CSV, plus a Parquet copy alongside for analysis."""
+        # One large buffer: the rows reach the file in a few big writes
+        with open(filepath, 'w', newline='', encoding='utf-8', buffering=CSV_WRITE_BUFFER) as f:
+            df.to_csv(f, index=False)
+        df.to_parquet(os.path.splitext(filepath)[0] + '.parquet', engine='pyarrow',
+                      compression='zstd', index=False)
+
+    def save_setups_pre_grok(self, setups: pd.DataFrame, filename: str = None):
         """Save setups BEFORE Grok analysis (scan-only mode)."""
         if not filename:
             filename = f"setups_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
         filepath = os.path.join(self.results_dir, filename)
 
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                'timestamp', 'price', 'layer_type', 'layer_price', 'layer_distance',
-                'layer_strength', 'layer_touches', 'atr', 'adx', 'market_status',
-                'volume_ratio'
-            ])
-            writer.writeheader()
-
-            for setup in setups:
-                row = {
-                    'timestamp': setup.timestamp,
-                    'price': setup.price,
-                    'layer_type': setup.layer_type,
-                    'layer_price': setup.layer_price,
-                    'layer_distance': setup.layer_distance,
-                    'layer_strength': setup.layer_strength,
-                    'layer_touches': setup.layer_touches,
-                    'atr': setup.atr,
-                    'adx': setup.adx,
-                    'market_status': setup.market_status,
-                    'volume_ratio': setup.volume_ratio
-                }
-                writer.writerow(row)
+        self._write_frame(setups[SCAN_COLUMNS], filepath)
 
         print(f"[Backtest] Setups saved to {filepath}")
         return filepath
 
-    def save_results(self, setups: List[BacktestSetup], filename: str = None):
+    def save_results(self, setups: pd.DataFrame, filename: str = None):
         """Save backtest results to CSV (after Grok analysis)."""
         if not filename:
             filename = f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
         filepath = os.path.join(self.results_dir, filename)
 
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                'timestamp', 'price', 'layer_type', 'layer_price', 'layer_distance',
-                'layer_strength', 'layer_touches', 'atr', 'adx', 'market_status',
-                'volume_ratio', 'direction', 'confidence', 'tp', 'sl', 'reason'
-            ])
-            writer.writeheader()
-
-            for setup in setups:
-                row = asdict(setup)
-                del row['ohlcv_summary']  # Don't save the large summary
-                writer.writerow(row)
+        self._write_frame(setups[RESULT_COLUMNS], filepath)
 
         print(f"[Backtest] Results saved to {filepath}")
         return filepath
 
-    def print_scan_summary(self, setups: List[BacktestSetup]):
+    def print_scan_summary(self, setups: pd.DataFrame):
         """Print summary for scan-only mode (before Grok analysis)."""
         total = len(setups)
         if total == 0:
             print("[Backtest] No setups found.")
             return
 
-        support_setups = [s for s in setups if s.layer_type == 'support']
-        resistance_setups = [s for s in setups if s.layer_type == 'resistance']
-
-        trending = [s for s in setups if s.market_status == 'TREND']
-        ranging = [s for s in setups if s.market_status == 'RANGE']
-
-        high_strength = [s for s in setups if s.layer_strength == 3]
-        medium_strength = [s for s in setups if s.layer_strength == 2]
-        low_strength = [s for s in setups if s.layer_strength == 1]
+        n_support = int((setups['layer_type'] == 'support').sum())
+        n_resistance = int((setups['layer_type'] == 'resistance').sum())
+        n_trend = int((setups['market_status'] == 'TREND').sum())
+        n_range = int((setups['market_status'] == 'RANGE').sum())
+        by_strength = setups['layer_strength'].value_counts()
 
         print("\n" + "=" * 60)
         print("SCAN SUMMARY (Pre-Grok)")
@@ -393,23 +513,23 @@ class Backtester:
         print(f"Total Setups Found: {total}")
         print()
         print(f"By Layer Type:")
-        print(f"  - Near SUPPORT:    {len(support_setups)} ({len(support_setups)/total*100:.1f}%)")
-        print(f"  - Near RESISTANCE: {len(resistance_setups)} ({len(resistance_setups)/total*100:.1f}%)")
+        print(f"  - Near SUPPORT:    {n_support} ({n_support/total*100:.1f}%)")
+        print(f"  - Near RESISTANCE: {n_resistance} ({n_resistance/total*100:.1f}%)")
         print()
         print(f"By Market Status:")
-        print(f"  - TRENDING: {len(trending)} ({len(trending)/total*100:.1f}%)")
-        print(f"  - RANGING:  {len(ranging)} ({len(ranging)/total*100:.1f}%)")
+        print(f"  - TRENDING: {n_trend} ({n_trend/total*100:.1f}%)")
+        print(f"  - RANGING:  {n_range} ({n_range/total*100:.1f}%)")
         print()
         print(f"By Layer Strength:")
-        print(f"  - Strong (3/3): {len(high_strength)} setups")
-        print(f"  - Medium (2/3): {len(medium_strength)} setups")
-        print(f"  - Weak (1/3):   {len(low_strength)} setups")
+        print(f"  - Strong (3/3): {by_strength.get(3, 0)} setups")
+        print(f"  - Medium (2/3): {by_strength.get(2, 0)} setups")
+        print(f"  - Weak (1/3):   {by_strength.get(1, 0)} setups")
         print()
 
         # Show sample setups
         print("Sample Setups (first 10):")
         print("-" * 60)
-        for s in setups[:10]:
+        for s in setups.head(10).itertuples():
             print(f"  {s.timestamp} | {s.layer_type:10} | Price: {s.price:.8f} | Strength: {s.layer_strength}/3 | ADX: {s.adx:.1f}")
 
         if total > 10:
@@ -420,53 +540,55 @@ class Backtester:
         print(f"  python -m src.backtest --days 3")
         print("=" * 60)
 
-    def print_summary(self, setups: List[BacktestSetup]):
+    def print_summary(self, setups: pd.DataFrame):
         """Print backtest summary statistics (after Grok analysis)."""
         total = len(setups)
         if total == 0:
             print("[Backtest] No setups found.")
             return
 
-        longs = [s for s in setups if s.direction == 'LONG']
-        shorts = [s for s in setups if s.direction == 'SHORT']
-        skips = [s for s in setups if s.direction == 'SKIP']
-        errors = [s for s in setups if s.direction == 'ERROR']
+        direction = setups['direction']
+        confidence = setups['confidence']
+        longs = direction == 'LONG'
+        shorts = direction == 'SHORT'
+        n_longs = int(longs.sum())
+        n_shorts = int(shorts.sum())
+        n_skips = int((direction == 'SKIP').sum())
+        n_errors = int((direction == 'ERROR').sum())
 
-        high_conf = [s for s in setups if s.confidence >= 80]
-        medium_conf = [s for s in setups if 60 <= s.confidence < 80]
-        low_conf = [s for s in setups if s.confidence < 60 and s.direction not in ['SKIP', 'ERROR']]
+        high_conf = int((confidence >= 80).sum())
+        medium_conf = int(((confidence >= 60) & (confidence < 80)).sum())
+        low_conf = int(((confidence < 60) & ~direction.isin(['SKIP', 'ERROR'])).sum())
 
         print("\n" + "=" * 60)
         print("BACKTEST SUMMARY")
         print("=" * 60)
         print(f"Total Setups Analyzed: {total}")
-        print(f"  - LONG signals:  {len(longs)} ({len(longs)/total*100:.1f}%)")
-        print(f"  - SHORT signals: {len(shorts)} ({len(shorts)/total*100:.1f}%)")
-        print(f"  - SKIP signals:  {len(skips)} ({len(skips)/total*100:.1f}%)")
-        print(f"  - ERRORS:        {len(errors)} ({len(errors)/total*100:.1f}%)")
+        print(f"  - LONG signals:  {n_longs} ({n_longs/total*100:.1f}%)")
+        print(f"  - SHORT signals: {n_shorts} ({n_shorts/total*100:.1f}%)")
+        print(f"  - SKIP signals:  {n_skips} ({n_skips/total*100:.1f}%)")
+        print(f"  - ERRORS:        {n_errors} ({n_errors/total*100:.1f}%)")
         print()
         print(f"Confidence Distribution:")
-        print(f"  - High (>=80%):    {len(high_conf)} signals")
-        print(f"  - Medium (60-79%): {len(medium_conf)} signals")
-        print(f"  - Low (<60%):      {len(low_conf)} signals")
+        print(f"  - High (>=80%):    {high_conf} signals")
+        print(f"  - Medium (60-79%): {medium_conf} signals")
+        print(f"  - Low (<60%):      {low_conf} signals")
         print()
 
-        if longs:
-            avg_conf_long = sum(s.confidence for s in longs) / len(longs)
-            print(f"Avg LONG confidence: {avg_conf_long:.1f}%")
-        if shorts:
-            avg_conf_short = sum(s.confidence for s in shorts) / len(shorts)
-            print(f"Avg SHORT confidence: {avg_conf_short:.1f}%")
+        if n_longs:
+            print(f"Avg LONG confidence: {confidence[longs].mean():.1f}%")
+        if n_shorts:
+            print(f"Avg SHORT confidence: {confidence[shorts].mean():.1f}%")
 
-        # Show top 5 highest confidence setups
-        actionable = [s for s in setups if s.direction in ['LONG', 'SHORT']]
-        actionable.sort(key=lambda x: x.confidence, reverse=True)
+        # Show top 5 highest confidence setups (top-K selection, not a full sort;
+        # keep='first': ties keep time order)
+        top = setups[longs | shorts].nlargest(5, 'confidence', keep='first')
 
-        if actionable:
+        if len(top):
             print()
             print("Top 5 Highest Confidence Setups:")
             print("-" * 60)
-            for s in actionable[:5]:
+            for s in top.itertuples():
                 print(f"  {s.timestamp} | {s.direction:5} | {s.confidence}% | {s.layer_type} @ {s.price:.8f}")
                 print(f"    TP: {s.tp:.8f} | SL: {s.sl:.8f} | {s.reason[:50]}")
 
@@ -485,16 +607,17 @@ class Backtester:
         print("=" * 60)
 
         # Step 1: Fetch historical data
-        candles = self.fetch_historical_data(days)
+        candles = await self.fetch_historical_data(days)
+        self.candles = candles
 
-        if len(candles) < LOOKBACK_CANDLES + 10:
+        if len(candles['close']) < LOOKBACK_CANDLES + 10:
             print("[Backtest] Not enough data for backtesting")
             return
 
         # Step 2: Find all potential setups
         setups = self.find_setups(candles)
 
-        if not setups:
+        if setups.empty:
             print("[Backtest] No setups found near layers")
             return
 
@@ -509,8 +632,16 @@ class Backtester:
             return setups
 
         # Step 5: Analyze setups with Grok (async batch, no cooldown)
+        # BacktestSetup objects are only built for the Grok step
         print("\n[Backtest] Starting Grok analysis...")
-        analyzed_setups = await self.analyze_all_setups_async(setups)
+        try:
+            analyzed = await self.analyze_all_setups_async([
+                BacktestSetup(**row) for row in setups.to_dict('records')
+            ])
+        finally:
+            await self.grok.aclose()
+        print(f"[Backtest] Grok responses from cache: {self.grok.cache_hits}")
+        analyzed_setups = self._setups_frame(analyzed, RESULT_COLUMNS)
 
         # Step 6: Save results with Grok analysis
         self.save_results(analyzed_setups)
@@ -525,6 +656,7 @@ async def main():
     """Entry point for backtesting."""
     # Parse command line arguments
     scan_only = "--scan-only" in sys.argv
+    use_cache = "--no-cache" not in sys.argv
 
     days = 3  # default
     for i, arg in enumerate(sys.argv):
@@ -535,9 +667,9 @@ async def main():
                 print(f"Invalid days value: {sys.argv[i + 1]}")
                 sys.exit(1)
 
-    backtester = Backtester(scan_only=scan_only)
+    backtester = Backtester(scan_only=scan_only, use_cache=use_cache)
     await backtester.run(days=days)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
@@ -4,29 +4,139 @@ Uses OpenAI-compatible API.
 """
 import os
 import re
-from typing import Dict, Optional
-from openai import OpenAI
+import json
+import hashlib
+from typing import Dict, List, Optional
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 
+from src.utils import TokenBucket
+
 load_dotenv()
 
+# Transient API errors (429 / 5xx / timeouts) are retried by the OpenAI SDK with
+# exponential backoff, honouring Retry-After
+MAX_RETRIES = 4
+
+# Part of the response cache key: bump when a prompt template changes
+PROMPT_VERSION = 1
+
+# Response parsing: one "KEY: value" match per line (leading whitespace allowed)
+_TECHNICAL_LINE_RE = re.compile(r'^[ \t]*(DIRECTION|CONFIDENCE|TP|SL|REASON):(.*)$', re.MULTILINE)
+_SENTIMENT_LINE_RE = re.compile(
+    r'^[ \t]*(TAKE_TRADE|SENTIMENT|BUZZ_SCORE|BTC_STATUS|WHALE_ALERT|REASON):(.*)$', re.MULTILINE
+)
+# Block headers may carry markdown decoration, e.g. "SETUP #1:", "**SETUP #1**" or "### SETUP #1"
+_SETUP_BLOCK_RE = re.compile(r'^[\s>*#_-]*SETUP\s*#(\d+)[*_:]*', re.MULTILINE)
+_INT_RE = re.compile(r'\d+')
+_PRICE_RE = re.compile(r'[\d.]+')
+
 
 class GrokClient:
     """Client for Grok API (OpenAI-compatible)."""
 
-    def __init__(self):
-        """Initialize the Grok client."""
+    def __init__(self, cache_dir: Optional[str] = None, max_connections: int = 10,
+                 requests_per_second: Optional[float] = None):
+        """
+        Initialize the Grok client.
+
+        Args:
+            cache_dir: Directory for cached technical-analysis responses (disabled if None)
+            max_connections: Connection pool size of the async client (kept alive between calls)
+            requests_per_second: Rate limit for async API calls, so bursts stay under the
+                API quota (unlimited if None); cache hits are not counted
+        """
         self.api_key = os.getenv("GROK_API_KEY")
         if not self.api_key:
             raise ValueError("GROK_API_KEY not found in environment variables")
 
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://api.x.ai/v1"
+            base_url="https://api.x.ai/v1",
+            max_retries=MAX_RETRIES
         )
+        # Native async client for concurrent callers: no thread hop per request
+        self.async_client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url="https://api.x.ai/v1",
+            max_retries=MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ))
+        )
+        self.rate_limiter = TokenBucket(requests_per_second, max_connections) if requests_per_second else None
         self.model = "grok-4"  # Grok 4 model
+        self.cache_dir = cache_dir
+        self.cache_hits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, prompt: str) -> str:
+        """Response cache file for a prompt (keyed by prompt version, model and prompt text)."""
+        key = hashlib.sha256(f"{PROMPT_VERSION}\n{self.model}\n{prompt}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _cache_get(self, prompt: str) -> Optional[str]:
+        """Cached response content for a prompt, or None on a miss (or with caching disabled)."""
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(prompt)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            self.cache_hits += 1
+            return json.load(f)['content']
+
+    def _cache_put(self, prompt: str, content: str) -> None:
+        """Store a response in the cache (no-op with caching disabled)."""
+        if not self.cache_dir:
+            return
+        # Write atomically so concurrent runs never read a partial file
+        path = self._cache_path(prompt)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model, 'content': content}, f)
+        os.replace(tmp_path, path)
+
+    def _cached_completion(self, prompt: str, **kwargs) -> str:
+        """Chat completion for a single user prompt, served from the response cache when possible."""
+        content = self._cache_get(prompt)
+        if content is not None:
+            return content
+
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
+        )
+        content = response.choices[0].message.content
+        self._cache_put(prompt, content)
+        return content
+
+    async def _cached_completion_async(self, prompt: str, **kwargs) -> str:
+        """Async _cached_completion on the pooled async client."""
+        content = self._cache_get(prompt)
+        if content is not None:
+            return content
+
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
+        )
+        content = response.choices[0].message.content
+        self._cache_put(prompt, content)
+        return content
 
-    def analyze_technical(
+    async def aclose(self) -> None:
+        """Close the async client's connection pool."""
+        await self.async_client.close()
+
+    def _technical_prompt(
             self,
             price: float,
             layer_type: str,
@@ -39,13 +149,9 @@ class GrokClient:
             adx_value: float,
             market_status: str,
             volume_ratio: float
-    ) -> Dict:
-        """
-        Step 1: Technical-only analysis (no X search).
-
-        Returns: Dict with direction, confidence, tp, sl, reason
-        """
-        prompt = f"""You are an expert PEPE futures scalper. Analyze 1000PEPEUSDT for bounce trade.
+    ) -> str:
+        """Build the Step 1 technical-analysis prompt."""
+        return f"""You are an expert PEPE futures scalper. Analyze 1000PEPEUSDT for bounce trade.
 Use ONLY technical analysis (no sentiment/news needed yet).
 
 ===============================================================
@@ -81,25 +187,153 @@ TP: [price]
 SL: [price]
 REASON: [1 sentence]"""
 
+    def _technical_error(self, e: Exception) -> Dict:
+        """SKIP result returned when the technical-analysis call fails."""
+        print(f"[Grok] Technical analysis error: {e}")
+        return {
+            'direction': 'SKIP',
+            'confidence': 0,
+            'tp': 0,
+            'sl': 0,
+            'reason': f'API error: {str(e)}'
+        }
+
+    def analyze_technical(
+            self,
+            price: float,
+            layer_type: str,
+            layer_price: float,
+            layer_distance: float,
+            layer_strength: str,
+            layer_touches: int,
+            ohlcv_summary: str,
+            atr_value: float,
+            adx_value: float,
+            market_status: str,
+            volume_ratio: float
+    ) -> Dict:
+        """
+        Step 1: Technical-only analysis (no X search).
+
+        Returns: Dict with direction, confidence, tp, sl, reason
+        """
+        prompt = self._technical_prompt(
+            price, layer_type, layer_price, layer_distance, layer_strength, layer_touches,
+            ohlcv_summary, atr_value, adx_value, market_status, volume_ratio
+        )
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.3
-            )
+            content = self._cached_completion(prompt, max_tokens=200, temperature=0.3)
 
-            return self._parse_technical_response(response.choices[0].message.content, price, atr_value)
+            return self._parse_technical_response(content, price, atr_value)
 
         except Exception as e:
-            print(f"[Grok] Technical analysis error: {e}")
-            return {
-                'direction': 'SKIP',
-                'confidence': 0,
-                'tp': 0,
-                'sl': 0,
-                'reason': f'API error: {str(e)}'
-            }
+            return self._technical_error(e)
+
+    async def analyze_technical_async(
+            self,
+            price: float,
+            layer_type: str,
+            layer_price: float,
+            layer_distance: float,
+            layer_strength: str,
+            layer_touches: int,
+            ohlcv_summary: str,
+            atr_value: float,
+            adx_value: float,
+            market_status: str,
+            volume_ratio: float
+    ) -> Dict:
+        """Async analyze_technical for concurrent callers (same prompt, cache and result)."""
+        prompt = self._technical_prompt(
+            price, layer_type, layer_price, layer_distance, layer_strength, layer_touches,
+            ohlcv_summary, atr_value, adx_value, market_status, volume_ratio
+        )
+
+        try:
+            content = await self._cached_completion_async(prompt, max_tokens=200, temperature=0.3)
+
+            return self._parse_technical_response(content, price, atr_value)
+
+        except Exception as e:
+            return self._technical_error(e)
+
+    def _technical_batch_prompt(self, setups: List[Dict]) -> str:
+        """Build one technical-analysis prompt covering several setups (analyze_technical kwargs each)."""
+        sections = [
+            f"""===============================================================
+SETUP #{k}
+===============================================================
+Current Price: {s['price']:.8f}
+Near Layer: {s['layer_type']} at {s['layer_price']:.8f} ({s['layer_distance']:.3f}% away)
+Layer Strength: {s['layer_strength']}, {s['layer_touches']} touches
+
+OHLCV Summary (last 10 candles):
+{s['ohlcv_summary']}
+
+ATR(14): {s['atr_value']:.8f}
+ADX: {s['adx_value']:.1f}
+Market Status: {s['market_status']}
+Volume vs 20-bar avg: {s['volume_ratio']:.2f}x"""
+            for k, s in enumerate(setups, 1)
+        ]
+
+        return f"""You are an expert PEPE futures scalper. Analyze {len(setups)} 1000PEPEUSDT setups for bounce trades.
+Judge each setup on its own. Use ONLY technical analysis (no sentiment/news needed yet).
+Technical data is from 1-min candles.
+
+{chr(10).join(sections)}
+
+===============================================================
+TASK
+===============================================================
+For each setup, decide if it is technically a good scalp setup.
+Consider: layer strength, price action, volume, momentum.
+
+===============================================================
+RESPOND EXACTLY IN THIS FORMAT, ONE BLOCK PER SETUP, IN ORDER
+===============================================================
+SETUP #1:
+DIRECTION: [LONG / SHORT / SKIP]
+CONFIDENCE: [0-100]
+TP: [price]
+SL: [price]
+REASON: [1 sentence]
+(... up to SETUP #{len(setups)})"""
+
+    async def analyze_technical_batch_async(self, setups: List[Dict]) -> List[Dict]:
+        """
+        Technical analysis of several setups in one API call.
+
+        Args:
+            setups: analyze_technical keyword arguments, one dict per setup
+
+        Returns: One result dict per setup, in order (SKIP for setups missing from the response)
+        """
+        prompt = self._technical_batch_prompt(setups)
+
+        try:
+            content = await self._cached_completion_async(
+                prompt, max_tokens=200 * len(setups), temperature=0.3
+            )
+        except Exception as e:
+            error = self._technical_error(e)
+            return [dict(error) for _ in setups]
+
+        # re.split with a group gives [preamble, number, block, number, block, ...]
+        parts = _SETUP_BLOCK_RE.split(content)
+        blocks = {}
+        for number, block in zip(parts[1::2], parts[2::2]):
+            blocks.setdefault(int(number), block)
+
+        missing = [k for k in range(1, len(setups) + 1) if k not in blocks]
+        if missing:
+            print(f"[Grok] Batch response has no block for setup(s) {missing} of {len(setups)}; marked SKIP")
+
+        return [
+            self._parse_technical_response(blocks.get(k, ''), s['price'], s['atr_value'])
+            for k, s in enumerate(setups, 1)
+        ]
 
     def analyze_with_sentiment(
             self,
@@ -182,35 +416,33 @@ REASON: [1 sentence]"""
         }
 
         try:
-            lines = response.strip().split('\n')
-            for line in lines:
-                line = line.strip()
+            for match in _TECHNICAL_LINE_RE.finditer(response):
+                key, value = match.group(1), match.group(2)
+                # Fields end at the next colon; the reason keeps its colons
+                field = value.split(':')[0].strip()
 
-                if line.startswith('DIRECTION:'):
-                    direction = line.split(':')[1].strip().upper()
+                if key == 'DIRECTION':
+                    direction = field.upper()
                     if direction in ['LONG', 'SHORT', 'SKIP']:
                         result['direction'] = direction
 
-                elif line.startswith('CONFIDENCE:'):
-                    conf_str = line.split(':')[1].strip()
-                    conf_match = re.search(r'\d+', conf_str)
+                elif key == 'CONFIDENCE':
+                    conf_match = _INT_RE.search(field)
                     if conf_match:
                         result['confidence'] = int(conf_match.group())
 
-                elif line.startswith('TP:'):
-                    tp_str = line.split(':')[1].strip()
-                    tp_match = re.search(r'[\d.]+', tp_str)
+                elif key == 'TP':
+                    tp_match = _PRICE_RE.search(field)
                     if tp_match:
                         result['tp'] = float(tp_match.group())
 
-                elif line.startswith('SL:'):
-                    sl_str = line.split(':')[1].strip()
-                    sl_match = re.search(r'[\d.]+', sl_str)
+                elif key == 'SL':
+                    sl_match = _PRICE_RE.search(field)
                     if sl_match:
                         result['sl'] = float(sl_match.group())
 
-                elif line.startswith('REASON:'):
-                    result['reason'] = line.split(':', 1)[1].strip()
+                else:  # REASON
+                    result['reason'] = value.strip()
 
             # Set default TP/SL based on ATR if not parsed
             if result['tp'] == 0 and result['direction'] != 'SKIP':
@@ -238,33 +470,31 @@ REASON: [1 sentence]"""
         }
 
         try:
-            lines = response.strip().split('\n')
-            for line in lines:
-                line = line.strip()
+            for match in _SENTIMENT_LINE_RE.finditer(response):
+                key, value = match.group(1), match.group(2)
+                field = value.split(':')[0].strip().upper()
 
-                if line.startswith('TAKE_TRADE:'):
-                    result['take_trade'] = 'YES' in line.upper()
+                if key == 'TAKE_TRADE':
+                    result['take_trade'] = 'YES' in value.upper()
 
-                elif line.startswith('SENTIMENT:'):
-                    sentiment = line.split(':')[1].strip().upper()
-                    if sentiment in ['BULLISH', 'BEARISH', 'NEUTRAL']:
-                        result['sentiment'] = sentiment
+                elif key == 'SENTIMENT':
+                    if field in ['BULLISH', 'BEARISH', 'NEUTRAL']:
+                        result['sentiment'] = field
 
-                elif line.startswith('BUZZ_SCORE:'):
-                    buzz_match = re.search(r'\d+', line)
+                elif key == 'BUZZ_SCORE':
+                    buzz_match = _INT_RE.search(value)
                     if buzz_match:
                         result['buzz_score'] = int(buzz_match.group())
 
-                elif line.startswith('BTC_STATUS:'):
-                    btc = line.split(':')[1].strip().upper()
-                    if any(s in btc for s in ['UP', 'DOWN', 'FLAT']):
-                        result['btc_status'] = btc.split()[0]
+                elif key == 'BTC_STATUS':
+                    if any(s in field for s in ['UP', 'DOWN', 'FLAT']):
+                        result['btc_status'] = field.split()[0]
 
-                elif line.startswith('WHALE_ALERT:'):
-                    result['whale_alert'] = 'YES' in line.upper()
+                elif key == 'WHALE_ALERT':
+                    result['whale_alert'] = 'YES' in value.upper()
 
-                elif line.startswith('REASON:'):
-                    result['reason'] = line.split(':', 1)[1].strip()
+                else:  # REASON
+                    result['reason'] = value.strip()
 
         except Exception as e:
             print(f"[Grok] Sentiment parse error: {e}")
@@ -1,13 +1,17 @@
 """
 Layer detection module for identifying support/resistance levels.
 """
+import numpy as np
+from itertools import chain
+from operator import attrgetter, itemgetter
+from numba import njit, prange
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Layer:
-    """Represents a support or resistance layer."""
+    """Represents a support or resistance layer (immutable; slots keep it small and fast to read)."""
     price: float
     layer_type: str  # 'support' or 'resistance'
     touches: int
@@ -15,81 +19,95 @@ class Layer:
     distance_pct: float  # Distance from current price in %
 
 
-def detect_swing_highs(highs: List[float], lookback: int = 2) -> List[Tuple[int, float]]:
+def _neighbor_extremes(values: np.ndarray, lookback: int, find_highs: bool) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Detect swing high points.
+    Max (find_highs=True) or min of the `lookback` bars before and after every bar.
+
+    Reduces `lookback` shifted views with np.maximum/np.minimum, so the per-tick call
+    allocates no pandas objects; NaN where a side is incomplete, so edge bars never
+    compare as swings.
+
+    Returns: (previous-bars extreme, next-bars extreme)
+    """
+    n = len(values)
+    before = np.full(n, np.nan)
+    after = np.full(n, np.nan)
+    if n > lookback:
+        extreme = np.maximum if find_highs else np.minimum
+        before[lookback:] = extreme.reduce([values[lookback - j:n - j] for j in range(1, lookback + 1)])
+        after[:n - lookback] = extreme.reduce([values[j:n - lookback + j] for j in range(1, lookback + 1)])
+    return before, after
+
+
+def detect_swing_highs(highs: np.ndarray, lookback: int = 2) -> List[Tuple[int, float]]:
+    """
+    Detect swing high points (strictly above the `lookback` bars on each side).
 
     Returns: List of (index, price) tuples
     """
-    swings = []
-    for i in range(lookback, len(highs) - lookback):
-        is_swing = True
-        for j in range(1, lookback + 1):
-            if highs[i] <= highs[i - j] or highs[i] <= highs[i + j]:
-                is_swing = False
-                break
-        if is_swing:
-            swings.append((i, highs[i]))
-    return swings
+    highs = np.asarray(highs, dtype=np.float64)
+    before, after = _neighbor_extremes(highs, lookback, True)
+    idx = np.flatnonzero((highs > before) & (highs > after))
+    return list(zip(idx.tolist(), highs[idx].tolist()))
 
 
-def detect_swing_lows(lows: List[float], lookback: int = 2) -> List[Tuple[int, float]]:
+def detect_swing_lows(lows: np.ndarray, lookback: int = 2) -> List[Tuple[int, float]]:
     """
-    Detect swing low points.
+    Detect swing low points (strictly below the `lookback` bars on each side).
 
     Returns: List of (index, price) tuples
     """
-    swings = []
-    for i in range(lookback, len(lows) - lookback):
-        is_swing = True
-        for j in range(1, lookback + 1):
-            if lows[i] >= lows[i - j] or lows[i] >= lows[i + j]:
-                is_swing = False
-                break
-        if is_swing:
-            swings.append((i, lows[i]))
-    return swings
+    lows = np.asarray(lows, dtype=np.float64)
+    before, after = _neighbor_extremes(lows, lookback, False)
+    idx = np.flatnonzero((lows < before) & (lows < after))
+    return list(zip(idx.tolist(), lows[idx].tolist()))
 
 
 def cluster_levels(levels: List[Tuple[int, float]], threshold_pct: float = 0.1) -> List[Dict]:
     """
     Cluster nearby price levels together.
 
+    Levels are sorted by price and swept once: each joins the current cluster while it is
+    within threshold of the cluster's running mean, otherwise it starts a new cluster.
+    Sorted order means only the newest cluster can match, so no cluster search is needed.
+
     Args:
         levels: List of (index, price) tuples
         threshold_pct: Percentage threshold for clustering (default 0.1%)
 
-    Returns: List of dicts with 'price', 'touches', 'indices'
+    Returns: List of dicts with 'price', 'touches', 'indices', in ascending price order
     """
     if not levels:
         return []
 
     clusters = []
-
-    for idx, price in levels:
-        found = False
-        for cluster in clusters:
-            # Check if price is within threshold of existing cluster
-            if abs(cluster['price'] - price) / price * 100 < threshold_pct:
-                # Update cluster with weighted average
-                total_touches = cluster['touches'] + 1
-                cluster['price'] = (cluster['price'] * cluster['touches'] + price) / total_touches
-                cluster['touches'] = total_touches
-                cluster['indices'].append(idx)
-                found = True
-                break
-
-        if not found:
-            clusters.append({
+    cluster = None
+
+    for idx, price in sorted(levels, key=itemgetter(1)):
+        # Check if price is within threshold of the current cluster
+        if cluster is not None and abs(cluster['price'] - price) / price * 100 < threshold_pct:
+            # Update cluster with weighted average
+            total_touches = cluster['touches'] + 1
+            cluster['price'] = (cluster['price'] * cluster['touches'] + price) / total_touches
+            cluster['touches'] = total_touches
+            cluster['indices'].append(idx)
+        else:
+            cluster = {
                 'price': price,
                 'touches': 1,
                 'indices': [idx]
-            })
+            }
+            clusters.append(cluster)
 
     return clusters
 
 
-def calculate_layer_strength(cluster: Dict, total_bars: int, volumes: List[float] = None) -> int:
+def calculate_layer_strength(
+        cluster: Dict,
+        total_bars: int,
+        volumes: np.ndarray = None,
+        avg_volume: Optional[float] = None
+) -> int:
     """
     Calculate layer strength (1-3) based on factors.
 
@@ -98,6 +116,9 @@ def calculate_layer_strength(cluster: Dict, total_bars: int, volumes: List[float
     2. Recency (any touch in last 20 bars)
     3. Volume (high volume at touch points) - optional
 
+    When scoring many clusters, pass `volumes` as an array and its precomputed mean as
+    `avg_volume` so the mean is not recomputed per cluster.
+
     Returns: Strength score 1-3
     """
     strength = 0
@@ -113,17 +134,70 @@ def calculate_layer_strength(cluster: Dict, total_bars: int, volumes: List[float
         strength += 1
 
     # Factor 3: Volume confirmation (if volume data provided)
-    if volumes and cluster['indices']:
-        avg_volume = sum(volumes) / len(volumes) if volumes else 0
-        touch_volumes = [volumes[i] for i in cluster['indices'] if i < len(volumes)]
-        if touch_volumes:
-            avg_touch_volume = sum(touch_volumes) / len(touch_volumes)
-            if avg_touch_volume > avg_volume * 1.2:
-                strength += 1
+    if volumes is not None and len(volumes) and cluster['indices']:
+        volumes = np.asarray(volumes, dtype=np.float64)
+        if avg_volume is None:
+            avg_volume = volumes.mean()
+        indices = np.asarray(cluster['indices'])
+        touch_volumes = volumes[indices[indices < len(volumes)]]
+        if len(touch_volumes) and touch_volumes.mean() > avg_volume * 1.2:
+            strength += 1
 
     return max(1, min(3, strength))  # Ensure 1-3 range
 
 
+def find_layer_clusters(
+        highs: List[float],
+        lows: List[float],
+        volumes: List[float] = None,
+        cluster_threshold: float = 0.1
+) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Price-independent half of find_layers: swings, clusters and their strength.
+
+    Runs as one compiled kernel (layer_clusters_kernel). The result only changes with the
+    candle data, so callers can reuse it across price updates and pass it to select_layers
+    with the latest price.
+
+    Returns: (resistance_clusters, support_clusters), each a (prices, touches, strengths) array tuple
+    """
+    highs = np.ascontiguousarray(highs, dtype=np.float64)
+    lows = np.ascontiguousarray(lows, dtype=np.float64)
+    volumes = np.ascontiguousarray(volumes if volumes is not None else [], dtype=np.float64)
+
+    res_prices, res_touches, res_strengths, sup_prices, sup_touches, sup_strengths = \
+        layer_clusters_kernel(highs, lows, volumes, cluster_threshold)
+    return (res_prices, res_touches, res_strengths), (sup_prices, sup_touches, sup_strengths)
+
+
+def select_layers(
+        resistance_clusters: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        support_clusters: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        current_price: float,
+        max_layers: int = 4
+) -> Tuple[List[Layer], List[Layer]]:
+    """
+    Price-dependent half of find_layers: keep clusters on the right side of price,
+    sorted by touches (descending) then distance, and build Layer objects for the kept ones.
+
+    Returns: (resistance_layers, support_layers)
+    """
+    half_max = max_layers // 2
+    rp, rt, rs, rd = _select_layers(*resistance_clusters, current_price, True, half_max)
+    sp, st, ss, sd = _select_layers(*support_clusters, current_price, False, half_max)
+    return _to_layers('resistance', rp, rt, rs, rd), _to_layers('support', sp, st, ss, sd)
+
+
+def _to_layers(layer_type: str, prices, touches, strengths, distances) -> List[Layer]:
+    """Build Layer objects from parallel kernel output arrays."""
+    return [
+        Layer(price=price, layer_type=layer_type, touches=touch, strength=strength, distance_pct=distance)
+        for price, touch, strength, distance in zip(
+            prices.tolist(), touches.tolist(), strengths.tolist(), distances.tolist()
+        )
+    ]
+
+
 def find_layers(
         highs: List[float],
         lows: List[float],
@@ -136,10 +210,10 @@ def find_layers(
     Find support and resistance layers.
 
     Args:
-        highs: List of high prices
-        lows: List of low prices
+        highs: List or array of high prices
+        lows: List or array of low prices
         closes: List of close prices
-        volumes: List of volumes (optional)
+        volumes: List or array of volumes (optional)
         cluster_threshold: Clustering threshold in %
         max_layers: Maximum layers per side
 
@@ -148,50 +222,8 @@ def find_layers(
     if len(highs) < 10:
         return [], []
 
-    current_price = closes[-1]
-    total_bars = len(closes)
-
-    # Detect swings
-    swing_highs = detect_swing_highs(highs)
-    swing_lows = detect_swing_lows(lows)
-
-    # Cluster levels
-    resistance_clusters = cluster_levels(swing_highs, cluster_threshold)
-    support_clusters = cluster_levels(swing_lows, cluster_threshold)
-
-    # Convert to Layer objects and filter by position relative to current price
-    resistance_layers = []
-    for cluster in resistance_clusters:
-        if cluster['price'] > current_price:  # Must be above current price
-            strength = calculate_layer_strength(cluster, total_bars, volumes)
-            distance = (cluster['price'] - current_price) / current_price * 100
-            resistance_layers.append(Layer(
-                price=cluster['price'],
-                layer_type='resistance',
-                touches=cluster['touches'],
-                strength=strength,
-                distance_pct=distance
-            ))
-
-    support_layers = []
-    for cluster in support_clusters:
-        if cluster['price'] < current_price:  # Must be below current price
-            strength = calculate_layer_strength(cluster, total_bars, volumes)
-            distance = (current_price - cluster['price']) / current_price * 100
-            support_layers.append(Layer(
-                price=cluster['price'],
-                layer_type='support',
-                touches=cluster['touches'],
-                strength=strength,
-                distance_pct=distance
-            ))
-
-    # Sort by touches (descending) and limit
-    resistance_layers.sort(key=lambda x: (-x.touches, x.distance_pct))
-    support_layers.sort(key=lambda x: (-x.touches, x.distance_pct))
-
-    half_max = max_layers // 2
-    return resistance_layers[:half_max], support_layers[:half_max]
+    resistance_clusters, support_clusters = find_layer_clusters(highs, lows, volumes, cluster_threshold)
+    return select_layers(resistance_clusters, support_clusters, closes[-1], max_layers)
 
 
 def find_nearest_layer(
@@ -211,17 +243,8 @@ def find_nearest_layer(
 
     Returns: Nearest layer if within threshold, else None
     """
-    nearest = None
-    min_distance = float('inf')
-
-    all_layers = resistance_layers + support_layers
-
-    for layer in all_layers:
-        if layer.distance_pct < min_distance and layer.distance_pct <= threshold_pct:
-            min_distance = layer.distance_pct
-            nearest = layer
-
-    return nearest
+    in_range = (layer for layer in chain(resistance_layers, support_layers) if layer.distance_pct <= threshold_pct)
+    return min(in_range, key=attrgetter('distance_pct'), default=None)
 
 
 def format_layer_for_prompt(layer: Layer) -> str:
@@ -230,3 +253,286 @@ def format_layer_for_prompt(layer: Layer) -> str:
         f"{layer.layer_type.upper()} at {layer.price:.8f} "
         f"({layer.distance_pct:.3f}% away, {layer.touches} touches, {layer.strength}/3 strength)"
     )
+
+
+# === COMPILED CORE ===
+# Numeric mirror of the list-based helpers above: find_layers runs on it, and the backtests
+# use it directly for array-based scans. Layers come back as parallel arrays, not Layer objects.
+
+@njit(cache=True)
+def _swing_points(values, lookback, find_highs):
+    """Indices of swing highs (find_highs=True) or swing lows in a float64 array."""
+    n = len(values)
+    out = np.empty(max(n - 2 * lookback, 0), dtype=np.int64)
+    count = 0
+    for i in range(lookback, n - lookback):
+        is_swing = True
+        for j in range(1, lookback + 1):
+            if find_highs:
+                if values[i] <= values[i - j] or values[i] <= values[i + j]:
+                    is_swing = False
+                    break
+            else:
+                if values[i] >= values[i - j] or values[i] >= values[i + j]:
+                    is_swing = False
+                    break
+        if is_swing:
+            out[count] = i
+            count += 1
+    return out[:count]
+
+
+@njit(cache=True)
+def _cluster_levels(swing_idx, values, threshold_pct):
+    """
+    Same clustering as cluster_levels.
+
+    Returns: (cluster prices, cluster touches, cluster label of each swing)
+    """
+    n = len(swing_idx)
+    prices = np.empty(n)
+    touches = np.zeros(n, dtype=np.int64)
+    labels = np.empty(n, dtype=np.int64)
+    swing_prices = values[swing_idx]
+    n_clusters = 0
+    for k in np.argsort(swing_prices, kind='mergesort'):
+        price = swing_prices[k]
+        c = n_clusters - 1
+        if c >= 0 and abs(prices[c] - price) / price * 100 < threshold_pct:
+            total_touches = touches[c] + 1
+            prices[c] = (prices[c] * touches[c] + price) / total_touches
+            touches[c] = total_touches
+        else:
+            c = n_clusters
+            prices[c] = price
+            touches[c] = 1
+            n_clusters += 1
+        labels[k] = c
+    return prices[:n_clusters], touches[:n_clusters], labels
+
+
+@njit(cache=True)
+def _layer_strengths(swing_idx, labels, touches, total_bars, volumes, avg_volume):
+    """Same scoring as calculate_layer_strength, for every cluster at once."""
+    n_clusters = len(touches)
+    has_recent = np.zeros(n_clusters, dtype=np.bool_)
+    touch_vol_sum = np.zeros(n_clusters)
+    touch_vol_count = np.zeros(n_clusters, dtype=np.int64)
+    recent_threshold = total_bars - 20
+    n_vol = len(volumes)
+    for k in range(len(swing_idx)):
+        c = labels[k]
+        idx = swing_idx[k]
+        if idx >= recent_threshold:
+            has_recent[c] = True
+        if idx < n_vol:
+            touch_vol_sum[c] += volumes[idx]
+            touch_vol_count[c] += 1
+
+    strengths = np.empty(n_clusters, dtype=np.int64)
+    for c in range(n_clusters):
+        strength = 0
+        if touches[c] >= 2:
+            strength += 1
+        if has_recent[c]:
+            strength += 1
+        if n_vol > 0 and touch_vol_count[c] > 0:
+            if touch_vol_sum[c] / touch_vol_count[c] > avg_volume * 1.2:
+                strength += 1
+        strengths[c] = max(1, min(3, strength))
+    return strengths
+
+
+@njit(cache=True)
+def _select_layers(prices, touches, strengths, current_price, above, limit):
+    """Filter clusters to one side of price and keep the top `limit` by (-touches, distance)."""
+    n_clusters = len(prices)
+    # Side filter and distances as whole-array ops (|p - c| is bit-identical to the
+    # signed difference on the eligible side)
+    dists = np.abs(prices - current_price) / current_price * 100
+    eligible = prices > current_price if above else prices < current_price
+
+    # Repeated selection keeps the stable-sort tie order of the Python version
+    picked = np.empty(limit, dtype=np.int64)
+    n_picked = 0
+    for _ in range(limit):
+        best = -1
+        for c in range(n_clusters):
+            if not eligible[c]:
+                continue
+            if best == -1 or touches[c] > touches[best] or \
+                    (touches[c] == touches[best] and dists[c] < dists[best]):
+                best = c
+        if best == -1:
+            break
+        eligible[best] = False
+        picked[n_picked] = best
+        n_picked += 1
+    picked = picked[:n_picked]
+    return prices[picked], touches[picked], strengths[picked], dists[picked]
+
+
+@njit(cache=True)
+def layer_clusters_kernel(highs, lows, volumes, cluster_threshold=0.1):
+    """
+    Compiled find_layer_clusters: swings, clustering and strength fused in one call
+    (pass an empty `volumes` array to skip volume).
+
+    Returns: (res_prices, res_touches, res_strengths, sup_prices, sup_touches, sup_strengths)
+    """
+    total_bars = len(highs)
+
+    swing_highs = _swing_points(highs, 2, True)
+    swing_lows = _swing_points(lows, 2, False)
+
+    res_prices, res_touches, res_labels = _cluster_levels(swing_highs, highs, cluster_threshold)
+    sup_prices, sup_touches, sup_labels = _cluster_levels(swing_lows, lows, cluster_threshold)
+
+    avg_volume = volumes.mean() if len(volumes) > 0 else 0.0
+    res_strengths = _layer_strengths(swing_highs, res_labels, res_touches, total_bars, volumes, avg_volume)
+    sup_strengths = _layer_strengths(swing_lows, sup_labels, sup_touches, total_bars, volumes, avg_volume)
+    return res_prices, res_touches, res_strengths, sup_prices, sup_touches, sup_strengths
+
+
+@njit(cache=True)
+def find_layers_kernel(highs, lows, closes, volumes, cluster_threshold=0.1, max_layers=4):
+    """
+    Compiled find_layers over float64 arrays (pass an empty `volumes` array to skip volume).
+
+    Returns: (res_prices, res_touches, res_strengths, res_dists,
+              sup_prices, sup_touches, sup_strengths, sup_dists)
+    """
+    half_max = max_layers // 2
+    if len(highs) < 10:
+        half_max = 0
+
+    current_price = closes[-1]
+    res_prices, res_touches, res_strengths, sup_prices, sup_touches, sup_strengths = \
+        layer_clusters_kernel(highs, lows, volumes, cluster_threshold)
+
+    rp, rt, rs, rd = _select_layers(res_prices, res_touches, res_strengths, current_price, True, half_max)
+    sp, st, ss, sd = _select_layers(sup_prices, sup_touches, sup_strengths, current_price, False, half_max)
+    return rp, rt, rs, rd, sp, st, ss, sd
+
+
+@njit(cache=True)
+def nearest_layer_kernel(res_dists, sup_dists, threshold_pct=0.1):
+    """
+    Compiled find_nearest_layer.
+
+    Returns: index into resistance + support layers (in that order), or -1 if none is in range
+    """
+    nearest = -1
+    min_distance = np.inf
+    n_res = len(res_dists)
+    for k in range(n_res + len(sup_dists)):
+        dist = res_dists[k] if k < n_res else sup_dists[k - n_res]
+        if dist < min_distance and dist <= threshold_pct:
+            min_distance = dist
+            nearest = k
+    return nearest
+
+
+@njit(cache=True)
+def _rolling_nearest_block(highs, lows, closes, volumes, window, threshold_pct, cluster_threshold,
+                           half_max, swing_highs, swing_lows, volume_csum, first_end, stop_end,
+                           price, is_resistance, strength, touches, distance_pct):
+    """Fill the rolling_nearest_layer_kernel outputs for windows ending in [first_end, stop_end)."""
+    res_bounds = (-1, -1)
+    sup_bounds = (-1, -1)
+    res_prices = np.empty(0)
+    res_touches = np.empty(0, dtype=np.int64)
+    res_labels = np.empty(0, dtype=np.int64)
+    sup_prices = np.empty(0)
+    sup_touches = np.empty(0, dtype=np.int64)
+    sup_labels = np.empty(0, dtype=np.int64)
+
+    for end in range(first_end, stop_end):
+        start = end - window + 1
+        lo = np.searchsorted(swing_highs, start + 2)
+        hi = np.searchsorted(swing_highs, end - 1)
+        if (lo, hi) != res_bounds:
+            res_bounds = (lo, hi)
+            res_prices, res_touches, res_labels = _cluster_levels(
+                swing_highs[lo:hi], highs, cluster_threshold)
+        res_swings = swing_highs[lo:hi] - start
+
+        lo = np.searchsorted(swing_lows, start + 2)
+        hi = np.searchsorted(swing_lows, end - 1)
+        if (lo, hi) != sup_bounds:
+            sup_bounds = (lo, hi)
+            sup_prices, sup_touches, sup_labels = _cluster_levels(
+                swing_lows[lo:hi], lows, cluster_threshold)
+        sup_swings = swing_lows[lo:hi] - start
+
+        v = volumes[start:end + 1]
+        avg_volume = (volume_csum[end + 1] - volume_csum[start]) / window
+        res_strengths = _layer_strengths(res_swings, res_labels, res_touches, window, v, avg_volume)
+        sup_strengths = _layer_strengths(sup_swings, sup_labels, sup_touches, window, v, avg_volume)
+
+        current_price = closes[end]
+        rp, rt, rs, rd = _select_layers(res_prices, res_touches, res_strengths, current_price, True, half_max)
+        sp, st, ss, sd = _select_layers(sup_prices, sup_touches, sup_strengths, current_price, False, half_max)
+
+        near = nearest_layer_kernel(rd, sd, threshold_pct)
+        if near == -1:
+            continue
+        n_res = len(rp)
+        if near < n_res:
+            price[end] = rp[near]
+            is_resistance[end] = True
+            strength[end] = rs[near]
+            touches[end] = rt[near]
+            distance_pct[end] = rd[near]
+        else:
+            j = near - n_res
+            price[end] = sp[j]
+            strength[end] = ss[j]
+            touches[end] = st[j]
+            distance_pct[end] = sd[j]
+
+
+# Windows per parallel block; each block re-clusters once on entry, then incrementally
+ROLLING_BLOCK_SIZE = 2048
+
+
+@njit(parallel=True, cache=True)
+def rolling_nearest_layer_kernel(highs, lows, closes, volumes, window,
+                                 threshold_pct=0.1, cluster_threshold=0.1, max_layers=4):
+    """
+    find_layers_kernel + nearest_layer_kernel over every `window`-bar slice ending at each bar.
+
+    A swing point only looks 2 bars either side, so swings are detected once over the whole
+    history and each window just takes the ones at least 2 bars from its edges. Clustering
+    is redone only when that membership changes; the volume mean comes from prefix sums.
+    Windows are split into blocks that run in parallel (prange), each with its own cache.
+
+    Returns: per-bar arrays (price, is_resistance, strength, touches, distance_pct) of the
+    nearest layer, with price NaN where no layer is in range or the window is incomplete
+    """
+    n = len(closes)
+    price = np.full(n, np.nan)
+    is_resistance = np.zeros(n, dtype=np.bool_)
+    strength = np.zeros(n, dtype=np.int64)
+    touches = np.zeros(n, dtype=np.int64)
+    distance_pct = np.full(n, np.nan)
+
+    half_max = max_layers // 2
+    if window < 10:
+        half_max = 0
+
+    swing_highs = _swing_points(highs, 2, True)
+    swing_lows = _swing_points(lows, 2, False)
+    volume_csum = np.zeros(n + 1)
+    volume_csum[1:] = np.cumsum(volumes)
+
+    first_end = max(window - 1, 0)
+    n_blocks = (n - first_end + ROLLING_BLOCK_SIZE - 1) // ROLLING_BLOCK_SIZE
+    for b in prange(n_blocks):
+        block_start = first_end + b * ROLLING_BLOCK_SIZE
+        block_stop = min(block_start + ROLLING_BLOCK_SIZE, n)
+        _rolling_nearest_block(highs, lows, closes, volumes, window, threshold_pct, cluster_threshold,
+                               half_max, swing_highs, swing_lows, volume_csum, block_start, block_stop,
+                               price, is_resistance, strength, touches, distance_pct)
+
+    return price, is_resistance, strength, touches, distance_pct
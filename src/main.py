@@ -5,14 +5,20 @@ import asyncio
 import time
 import csv
 import os
+import sys
 from datetime import datetime
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
-from websocket import BinanceWebSocket
-from layers import find_layers, find_nearest_layer, format_layer_for_prompt
-from utils import calculate_atr, calculate_adx, is_ranging, calculate_position_size
-from grok import GrokClient
-from alerts import TelegramAlert
+# Import through the `src` package (like the backtests) so every entry point shares
+# the same compiled numba kernels in the on-disk cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.websocket import BinanceWebSocket
+from src.layers import find_layer_clusters, select_layers, find_nearest_layer, format_layer_for_prompt
+from src.utils import calculate_atr_adx, is_ranging, calculate_position_size, run_async
+from src.grok import GrokClient
+from src.alerts import TelegramAlert
 
 load_dotenv()
 
@@ -36,6 +42,14 @@ HIGH_CONFIDENCE = 80
 # Layer detection
 LAYER_THRESHOLD_PCT = 0.1  # Trigger when price is within 0.1% of layer
 
+# Logging
+LOG_FLUSH_SECONDS = 1.0  # Queued CSV rows are written in batches at most this often
+LOG_SHUTDOWN_TIMEOUT = 5.0  # Max seconds to wait for queued rows on shutdown
+LOG_HEADERS = {
+    "api_usage.csv": ['timestamp', 'type', 'cost', 'daily_calls', 'daily_x_searches'],
+    "trades.csv": ['timestamp', 'direction', 'entry', 'tp', 'sl', 'confidence', 'reason'],
+}
+
 
 class PepeScalpingBot:
     """Main bot class."""
@@ -49,16 +63,28 @@ class PepeScalpingBot:
         self.last_api_call = 0
         self.daily_calls = 0
         self.daily_x_searches = 0
-        self.last_reset_day = datetime.utcnow().day
+        self.last_reset_day = int(time.time() // 86400)  # UTC day number
 
-        # Logging
+        # Logging: rows are queued from the callback and written by a background task
         self.log_dir = "logs"
         os.makedirs(self.log_dir, exist_ok=True)
+        self._log_queue: asyncio.Queue = asyncio.Queue()
+        self._log_task: Optional[asyncio.Task] = None
+        self._log_flush_now = asyncio.Event()  # Set on shutdown: write without the batching delay
+        self._log_has_header = {
+            name: os.path.exists(os.path.join(self.log_dir, name)) for name in LOG_HEADERS
+        }
+
+        # Closed-bar indicators: (atr, adx, layer clusters), keyed on the last closed bar's timestamp
+        self._bar_ts = None
+        self._bar_indicators = None
 
     def can_call_api(self) -> bool:
         """Check if we can make an API call (cooldown + daily limit)."""
-        # Reset daily counters
-        current_day = datetime.utcnow().day
+        now = time.time()
+
+        # Reset daily counters (UTC days since the epoch, no datetime needed per tick)
+        current_day = int(now // 86400)
         if current_day != self.last_reset_day:
             self.daily_calls = 0
             self.daily_x_searches = 0
@@ -69,44 +95,82 @@ class PepeScalpingBot:
             return False
 
         # Check cooldown
-        elapsed = time.time() - self.last_api_call
+        elapsed = now - self.last_api_call
         return elapsed >= COOLDOWN_SECONDS
 
     def log_api_call(self, call_type: str, cost: float):
         """Log API call for cost tracking."""
-        log_file = os.path.join(self.log_dir, "api_usage.csv")
-        file_exists = os.path.exists(log_file)
-
-        with open(log_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['timestamp', 'type', 'cost', 'daily_calls', 'daily_x_searches'])
-            writer.writerow([
-                datetime.utcnow().isoformat(),
-                call_type,
-                cost,
-                self.daily_calls,
-                self.daily_x_searches
-            ])
+        self._log_queue.put_nowait(("api_usage.csv", [
+            datetime.utcnow().isoformat(),
+            call_type,
+            cost,
+            self.daily_calls,
+            self.daily_x_searches
+        ]))
 
     def log_trade_signal(self, direction: str, entry: float, tp: float, sl: float, confidence: int, reason: str):
         """Log trade signals."""
-        log_file = os.path.join(self.log_dir, "trades.csv")
-        file_exists = os.path.exists(log_file)
-
-        with open(log_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['timestamp', 'direction', 'entry', 'tp', 'sl', 'confidence', 'reason'])
-            writer.writerow([
-                datetime.utcnow().isoformat(),
-                direction,
-                entry,
-                tp,
-                sl,
-                confidence,
-                reason
-            ])
+        self._log_queue.put_nowait(("trades.csv", [
+            datetime.utcnow().isoformat(),
+            direction,
+            entry,
+            tp,
+            sl,
+            confidence,
+            reason
+        ]))
+
+    def _write_log_rows(self, rows_by_file: Dict[str, List[list]]):
+        """Append queued rows, opening each log file once per batch (runs in a worker thread)."""
+        for name, rows in rows_by_file.items():
+            with open(os.path.join(self.log_dir, name), 'a', newline='') as f:
+                writer = csv.writer(f)
+                if not self._log_has_header[name]:
+                    writer.writerow(LOG_HEADERS[name])
+                    self._log_has_header[name] = True
+                writer.writerows(rows)
+
+    async def _log_writer(self):
+        """Drain the log queue in batches so file I/O never blocks the candle callback."""
+        while True:
+            batch = [await self._log_queue.get()]
+            if not self._log_flush_now.is_set():
+                try:
+                    await asyncio.wait_for(self._log_flush_now.wait(), LOG_FLUSH_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            while not self._log_queue.empty():
+                batch.append(self._log_queue.get_nowait())
+
+            rows_by_file: Dict[str, List[list]] = {}
+            for name, row in batch:
+                rows_by_file.setdefault(name, []).append(row)
+            try:
+                await asyncio.to_thread(self._write_log_rows, rows_by_file)
+            except Exception as e:
+                print(f"[Bot] Warning: Could not write logs: {e}")
+            finally:
+                for _ in batch:
+                    self._log_queue.task_done()
+
+    async def _close_log_writer(self):
+        """Flush queued log rows (bounded by LOG_SHUTDOWN_TIMEOUT) and stop the writer task."""
+        if self._log_task is None:
+            return
+        self._log_flush_now.set()
+        # A writer that already stopped can't drain the queue; joining would hang
+        if not self._log_task.done():
+            try:
+                await asyncio.wait_for(self._log_queue.join(), LOG_SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"[Bot] Warning: {self._log_queue.qsize()} log rows not written")
+        self._log_task.cancel()
+        try:
+            await self._log_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[Bot] Warning: Log writer failed: {e}")
 
     async def on_candle(self, candles):
         """Callback for each candle update."""
@@ -118,23 +182,29 @@ class PepeScalpingBot:
             self._update_count = 0
         self._update_count += 1
         if self._update_count % 60 == 0:
-            price = candles[-1]['close']
+            price = candles[-1, 4]
             print(f"[Bot] ♻️ Active | Price: {price:.8f} | Candles: {len(candles)} | Calls today: {self.daily_calls}")
 
         # Get OHLCV data
-        opens, highs, lows, closes, volumes = self.ws.get_ohlcv_lists()
-        current_price = closes[-1]
-
-        # Calculate indicators
-        atr = calculate_atr(highs, lows, closes)
-        adx = calculate_adx(highs, lows, closes)
+        opens, highs, lows, closes, volumes = self.ws.get_ohlcv_arrays()
+        current_price = float(closes[-1])
+
+        # Calculate indicators and layer clusters from closed bars only, once per closed bar;
+        # the stream sends many updates of the forming candle, which only move the price checks below
+        closed_ts = candles[-2, 0]
+        if closed_ts != self._bar_ts:
+            self._bar_ts = closed_ts
+            self._bar_indicators = (
+                *calculate_atr_adx(highs[:-1], lows[:-1], closes[:-1]),
+                find_layer_clusters(highs[:-1], lows[:-1], volumes[:-1], cluster_threshold=0.1)
+            )
+        atr, adx, (resistance_clusters, support_clusters) = self._bar_indicators
         market_status = "RANGE" if is_ranging(adx) else "TREND"
-        volume_ratio = volumes[-1] / (sum(volumes) / len(volumes)) if volumes else 1.0
+        volume_ratio = float(volumes[-1] / volumes.mean()) if len(volumes) else 1.0
 
-        # Find layers
-        resistance_layers, support_layers = find_layers(
-            highs, lows, closes, volumes,
-            cluster_threshold=0.1,
+        # Find layers relative to the latest price
+        resistance_layers, support_layers = select_layers(
+            resistance_clusters, support_clusters, current_price,
             max_layers=4
         )
 
@@ -271,6 +341,8 @@ class PepeScalpingBot:
         print(f"Cooldown: {COOLDOWN_SECONDS}s")
         print("=" * 60)
 
+        self._log_task = asyncio.create_task(self._log_writer())
+
         # Connect to WebSocket
         await self.ws.connect()
 
@@ -296,6 +368,8 @@ class PepeScalpingBot:
                 pass
         finally:
             await self.ws.close()
+            # Flush queued log rows before exiting
+            await self._close_log_writer()
             print("[Bot] Goodbye!")
 
 
@@ -306,4 +380,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
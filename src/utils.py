@@ -1,62 +1,247 @@
 """
 Utility functions for technical analysis: ATR, ADX, etc.
 """
-import pandas as pd
+import sys
+import time
+import asyncio
 import numpy as np
+from numba import njit
 from typing import List, Tuple
 
 
-def calculate_atr(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> float:
-    """Calculate Average True Range (ATR)."""
-    if len(highs) < period + 1:
+@njit(cache=True)
+def _true_range(highs, lows, closes):
+    """True Range per bar (the first bar has no previous close, so TR = high - low)."""
+    n = len(highs)
+    tr = np.empty(n)
+    if n == 0:
+        return tr
+    tr[0] = highs[0] - lows[0]
+    for i in range(1, n):
+        prev_close = closes[i - 1]
+        tr[i] = max(highs[i] - lows[i], abs(highs[i] - prev_close), abs(lows[i] - prev_close))
+    return tr
+
+
+@njit(cache=True)
+def _wilder_step(weighted, old_wt, nobs, x, decay):
+    """One step of _wilder_mean: returns the updated (weighted, old_wt, nobs) state."""
+    is_obs = not np.isnan(x)
+    if is_obs:
+        nobs += 1
+    if not np.isnan(weighted):
+        old_wt *= decay
+        if is_obs:
+            if weighted != x:
+                weighted = (old_wt * weighted + x) / (old_wt + 1.0)
+            old_wt += 1.0
+    elif is_obs:
+        weighted = x
+    return weighted, old_wt, nobs
+
+
+@njit(cache=True)
+def _wilder_mean(values, period):
+    """
+    Wilder's smoothing, matching pandas `ewm(alpha=1/period, min_periods=period).mean()`.
+
+    NaN inputs are skipped the same way pandas does (ignore_na=False), so leading
+    NaNs simply delay the start of the average.
+    """
+    n = len(values)
+    out = np.empty(n)
+    decay = 1.0 - 1.0 / period
+    weighted = np.nan
+    old_wt = 1.0
+    nobs = 0
+    for i in range(n):
+        weighted, old_wt, nobs = _wilder_step(weighted, old_wt, nobs, values[i], decay)
+        out[i] = weighted if nobs >= period else np.nan
+    return out
+
+
+@njit(cache=True)
+def compute_atr_series(highs, lows, closes, n=14):
+    """ATR for every bar of float64 arrays in one pass (NaN until `n` bars are available)."""
+    return _wilder_mean(_true_range(highs, lows, closes), n)
+
+
+@njit(cache=True)
+def compute_adx_series(highs, lows, closes, n=14):
+    """ADX for every bar of float64 arrays in one pass (NaN during the warmup bars)."""
+    size = len(highs)
+
+    # +DM and -DM (the first bar has no previous bar, so both are 0)
+    plus_dm = np.zeros(size)
+    minus_dm = np.zeros(size)
+    for i in range(1, size):
+        up_move = highs[i] - highs[i - 1]
+        down_move = lows[i - 1] - lows[i]
+        if up_move > down_move and up_move > 0:
+            plus_dm[i] = up_move
+        if down_move > up_move and down_move > 0:
+            minus_dm[i] = down_move
+
+    # Smoothed values (Wilder's smoothing)
+    atr = compute_atr_series(highs, lows, closes, n)
+    plus_s = _wilder_mean(plus_dm, n)
+    minus_s = _wilder_mean(minus_dm, n)
+
+    # DX and ADX
+    dx = np.empty(size)
+    for i in range(size):
+        if atr[i] == 0 or np.isnan(atr[i]):
+            dx[i] = np.nan
+            continue
+        plus_di = 100 * plus_s[i] / atr[i]
+        minus_di = 100 * minus_s[i] / atr[i]
+        di_sum = plus_di + minus_di
+        dx[i] = 100 * abs(plus_di - minus_di) / (di_sum if di_sum != 0 else 1.0)
+    return _wilder_mean(dx, n)
+
+
+@njit(cache=True)
+def compute_volume_ratio_series(volumes, window):
+    """Volume of each bar vs the mean of the trailing `window` bars (NaN until the window is full)."""
+    size = len(volumes)
+    out = np.full(size, np.nan)
+    window_sum = 0.0
+    for i in range(size):
+        window_sum += volumes[i]
+        if i >= window:
+            window_sum -= volumes[i - window]
+        if i >= window - 1:
+            mean = window_sum / window
+            out[i] = volumes[i] / mean if mean > 0 else 1.0
+    return out
+
+
+@njit(cache=True)
+def atr_kernel(highs, lows, closes, period=14):
+    """
+    ATR of the last bar for float64 arrays (compiled core of calculate_atr).
+
+    Same result as compute_atr_series(...)[-1], but TR and the smoothing run as one
+    scalar recurrence without allocating the intermediate series.
+    """
+    n = len(highs)
+    if n < period + 1:
         return 0.0
+    decay = 1.0 - 1.0 / period
+    atr, atr_wt, nobs = np.nan, 1.0, 0
+    for i in range(n):
+        if i == 0:
+            tr = highs[0] - lows[0]
+        else:
+            prev_close = closes[i - 1]
+            tr = max(highs[i] - lows[i], abs(highs[i] - prev_close), abs(lows[i] - prev_close))
+        atr, atr_wt, nobs = _wilder_step(atr, atr_wt, nobs, tr, decay)
+    return atr
 
-    df = pd.DataFrame({'high': highs, 'low': lows, 'close': closes})
 
-    # True Range
-    df['tr1'] = df['high'] - df['low']
-    df['tr2'] = abs(df['high'] - df['close'].shift(1))
-    df['tr3'] = abs(df['low'] - df['close'].shift(1))
-    df['tr'] = df[['tr1', 'tr2', 'tr3']].max(axis=1)
+@njit(cache=True)
+def atr_adx_kernel(highs, lows, closes, period=14):
+    """
+    (ATR, ADX) of the last bar for float64 arrays (compiled core of calculate_atr_adx).
 
-    # ATR (RMA/Wilder's smoothing)
-    atr = df['tr'].ewm(alpha=1/period, min_periods=period).mean().iloc[-1]
-    return float(atr)
+    Same results as atr_kernel and adx_kernel, with TR, +DM/-DM, DX and all four
+    Wilder smoothings fused into a single pass over the bars.
+    """
+    n = len(highs)
+    if n < period + 1:
+        return 0.0, 0.0
+    decay = 1.0 - 1.0 / period
+    atr, atr_wt, nobs = np.nan, 1.0, 0
+    plus_s, plus_wt, plus_nobs = np.nan, 1.0, 0
+    minus_s, minus_wt, minus_nobs = np.nan, 1.0, 0
+    adx, adx_wt, adx_nobs = np.nan, 1.0, 0
+    for i in range(n):
+        plus_dm = 0.0
+        minus_dm = 0.0
+        if i == 0:
+            tr = highs[0] - lows[0]
+        else:
+            prev_close = closes[i - 1]
+            tr = max(highs[i] - lows[i], abs(highs[i] - prev_close), abs(lows[i] - prev_close))
+            up_move = highs[i] - highs[i - 1]
+            down_move = lows[i - 1] - lows[i]
+            if up_move > down_move and up_move > 0:
+                plus_dm = up_move
+            if down_move > up_move and down_move > 0:
+                minus_dm = down_move
 
+        atr, atr_wt, nobs = _wilder_step(atr, atr_wt, nobs, tr, decay)
+        plus_s, plus_wt, plus_nobs = _wilder_step(plus_s, plus_wt, plus_nobs, plus_dm, decay)
+        minus_s, minus_wt, minus_nobs = _wilder_step(minus_s, minus_wt, minus_nobs, minus_dm, decay)
 
-def calculate_adx(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> float:
-    """Calculate Average Directional Index (ADX)."""
+        # DX is NaN until the smoothed values have `period` observations
+        dx = np.nan
+        if nobs >= period and atr != 0:
+            plus_di = 100 * plus_s / atr
+            minus_di = 100 * minus_s / atr
+            di_sum = plus_di + minus_di
+            dx = 100 * abs(plus_di - minus_di) / (di_sum if di_sum != 0 else 1.0)
+        adx, adx_wt, adx_nobs = _wilder_step(adx, adx_wt, adx_nobs, dx, decay)
+    if n < period * 2:
+        return atr, 0.0
+    return atr, (adx if adx_nobs >= period else np.nan)
+
+
+@njit(cache=True)
+def adx_kernel(highs, lows, closes, period=14):
+    """ADX of the last bar for float64 arrays (compiled core of calculate_adx)."""
     if len(highs) < period * 2:
         return 0.0
+    return atr_adx_kernel(highs, lows, closes, period)[1]
 
-    df = pd.DataFrame({'high': highs, 'low': lows, 'close': closes})
 
-    # +DM and -DM
-    df['up_move'] = df['high'].diff()
-    df['down_move'] = -df['low'].diff()
+def calculate_atr(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> float:
+    """
+    Calculate Average True Range (ATR).
 
-    df['+dm'] = np.where((df['up_move'] > df['down_move']) & (df['up_move'] > 0), df['up_move'], 0)
-    df['-dm'] = np.where((df['down_move'] > df['up_move']) & (df['down_move'] > 0), df['down_move'], 0)
+    Accepts lists or arrays; inputs are passed to the kernel as contiguous float64 so
+    strided views reuse the same cached compiled signature instead of a new one.
+    """
+    if len(highs) < period + 1:
+        return 0.0
 
-    # True Range
-    df['tr1'] = df['high'] - df['low']
-    df['tr2'] = abs(df['high'] - df['close'].shift(1))
-    df['tr3'] = abs(df['low'] - df['close'].shift(1))
-    df['tr'] = df[['tr1', 'tr2', 'tr3']].max(axis=1)
+    return float(atr_kernel(
+        np.ascontiguousarray(highs, dtype=np.float64),
+        np.ascontiguousarray(lows, dtype=np.float64),
+        np.ascontiguousarray(closes, dtype=np.float64),
+        period
+    ))
 
-    # Smoothed values (Wilder's smoothing)
-    alpha = 1 / period
-    df['atr'] = df['tr'].ewm(alpha=alpha, min_periods=period).mean()
-    df['+di'] = 100 * df['+dm'].ewm(alpha=alpha, min_periods=period).mean() / df['atr']
-    df['-di'] = 100 * df['-dm'].ewm(alpha=alpha, min_periods=period).mean() / df['atr']
 
-    # DX and ADX
-    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di']).replace(0, 1)
-    df['adx'] = df['dx'].ewm(alpha=alpha, min_periods=period).mean()
+def calculate_adx(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> float:
+    """Calculate Average Directional Index (ADX). Inputs are handled as in calculate_atr."""
+    if len(highs) < period * 2:
+        return 0.0
+
+    return float(adx_kernel(
+        np.ascontiguousarray(highs, dtype=np.float64),
+        np.ascontiguousarray(lows, dtype=np.float64),
+        np.ascontiguousarray(closes, dtype=np.float64),
+        period
+    ))
 
-    return float(df['adx'].iloc[-1])
 
+def calculate_atr_adx(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> Tuple[float, float]:
+    """
+    Calculate ATR and ADX together in one pass (same values as calculate_atr/calculate_adx).
+
+    Inputs are handled as in calculate_atr.
+    """
+    atr, adx = atr_adx_kernel(
+        np.ascontiguousarray(highs, dtype=np.float64),
+        np.ascontiguousarray(lows, dtype=np.float64),
+        np.ascontiguousarray(closes, dtype=np.float64),
+        period
+    )
+    return float(atr), float(adx)
 
+
+@njit(cache=True)
 def is_ranging(adx_value: float, threshold: float = 25.0) -> bool:
     """Check if market is ranging (ADX below threshold)."""
     return adx_value < threshold
@@ -91,3 +276,56 @@ def calculate_position_size(account_balance: float, risk_percent: float, entry:
 def format_price(price: float, decimals: int = 8) -> str:
     """Format price with appropriate decimal places."""
     return f"{price:.{decimals}f}"
+
+
+def run_async(main):
+    """
+    Run a coroutine like asyncio.run, on uvloop's libuv event loop when it is installed.
+
+    uvloop is optional and not available on Windows; the default loop is used otherwise.
+    """
+    if sys.platform != 'win32':
+        try:
+            import uvloop
+        except ImportError:
+            pass
+        else:
+            return uvloop.run(main)
+    return asyncio.run(main)
+
+
+class ThrottledPrinter:
+    """print() for progress lines inside loops, rate-limited to one line per `interval` seconds."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self._last = float('-inf')
+
+    def __call__(self, message: str, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now - self._last >= self.interval:
+            self._last = now
+            print(message, flush=True)
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: `rate` acquisitions per second, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it (callers are served in FIFO order)."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._last = time.monotonic()
+            self._tokens -= 1
@@ -2,8 +2,9 @@
 Binance WebSocket module for streaming 1-minute candles.
 """
 import asyncio
+import numpy as np
 import ccxt.pro as ccxtpro
-from typing import Callable, Optional, List, Dict
+from typing import Callable, Optional, List
 from datetime import datetime
 
 
@@ -23,7 +24,10 @@ class BinanceWebSocket:
         self.timeframe = timeframe
         self.limit = limit
         self.exchange: Optional[ccxtpro.binance] = None
-        self.candles: List[Dict] = []
+        # Last `limit` candles as an (N, 6) float64 array of [timestamp, open, high, low, close, volume]
+        self.candles = np.empty((0, 6))
+        # 'HH:MM:SS' of each candle, formatted once when the candle enters the window
+        self.candle_times = np.empty(0, dtype='<U8')
         self.running = False
         self.on_candle_callback: Optional[Callable] = None
 
@@ -43,7 +47,7 @@ class BinanceWebSocket:
                 print(f"[WebSocket] Loading Binance Futures markets (attempt {attempt + 1}/5)...")
                 await self.exchange.load_markets()
                 print(f"[WebSocket] Connected to Binance Futures ({len(self.exchange.markets)} markets)")
-                return
+                break
             except Exception as e:
                 print(f"[WebSocket] Connection failed: {e}")
                 if attempt < 4:
@@ -53,6 +57,12 @@ class BinanceWebSocket:
                 else:
                     raise Exception("Failed to connect to Binance after 5 attempts")
 
+        # The stream only carries candles from subscription onwards: seed the window
+        # once over REST so indicators are ready from the first update
+        ohlcv = await self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=self.limit)
+        self.merge_candles(ohlcv)
+        print(f"[WebSocket] Loaded {len(self.candles)} historical candles")
+
     async def close(self):
         """Close the exchange connection."""
         if self.exchange:
@@ -72,22 +82,10 @@ class BinanceWebSocket:
             try:
                 # Fetch OHLCV data via WebSocket
                 ohlcv = await self.exchange.watch_ohlcv(self.symbol, self.timeframe, limit=self.limit)
-
-                # Convert to list of dicts
-                self.candles = []
-                for candle in ohlcv:
-                    self.candles.append({
-                        'timestamp': candle[0],
-                        'datetime': datetime.fromtimestamp(candle[0] / 1000).isoformat(),
-                        'open': candle[1],
-                        'high': candle[2],
-                        'low': candle[3],
-                        'close': candle[4],
-                        'volume': candle[5]
-                    })
+                self.merge_candles(ohlcv)
 
                 # Call callback if set
-                if self.on_candle_callback and self.candles:
+                if self.on_candle_callback and len(self.candles):
                     await self.on_candle_callback(self.candles)
 
             except Exception as e:
@@ -98,41 +96,61 @@ class BinanceWebSocket:
         """Stop the WebSocket stream."""
         self.running = False
 
+    def merge_candles(self, ohlcv: List[List]):
+        """
+        Merge streamed candles into the window: the forming candle is updated in place,
+        new candles are appended and the oldest dropped beyond `limit`.
+        """
+        last_ts = self.candles[-1, 0] if len(self.candles) else -1
+
+        # ccxt hands back its whole cached window each time, oldest first; only the tail
+        # from the forming candle on is new, so walk back to it and convert just that
+        start = len(ohlcv)
+        while start > 0 and ohlcv[start - 1][0] >= last_ts:
+            start -= 1
+        if start == len(ohlcv):
+            return
+
+        new = np.asarray(ohlcv[start:], dtype=np.float64)
+        if new[0, 0] == last_ts:
+            self.candles[-1] = new[0]
+            new = new[1:]
+        if len(new):
+            self.candles = np.concatenate([self.candles, new])[-self.limit:]
+            times = [datetime.fromtimestamp(ts / 1000).strftime('%H:%M:%S') for ts in new[:, 0].tolist()]
+            self.candle_times = np.concatenate([self.candle_times, times])[-self.limit:]
+
     def get_current_price(self) -> float:
         """Get the current (latest close) price."""
-        if self.candles:
-            return self.candles[-1]['close']
+        if len(self.candles):
+            return float(self.candles[-1, 4])
         return 0.0
 
-    def get_ohlcv_lists(self) -> tuple:
-        """Get OHLCV data as separate lists for calculations."""
-        if not self.candles:
-            return [], [], [], [], []
+    def get_ohlcv_arrays(self) -> tuple:
+        """
+        Get OHLCV data as separate float64 arrays for calculations.
 
-        opens = [c['open'] for c in self.candles]
-        highs = [c['high'] for c in self.candles]
-        lows = [c['low'] for c in self.candles]
-        closes = [c['close'] for c in self.candles]
-        volumes = [c['volume'] for c in self.candles]
+        The columns are transposed in one copy, so each returned array is a contiguous
+        view that the indicator kernels can use without converting it again.
+        """
+        opens, highs, lows, closes, volumes = np.ascontiguousarray(self.candles[:, 1:].T)
 
         return opens, highs, lows, closes, volumes
 
     def get_candles_summary(self) -> str:
         """Get a summary of recent candles for the AI prompt."""
-        if not self.candles:
+        if not len(self.candles):
             return "No data"
 
         recent = self.candles[-10:]  # Last 10 candles
-        summary_lines = []
+        changes = (recent[:, 4] - recent[:, 1]) / recent[:, 1] * 100
 
-        for c in recent:
-            change = ((c['close'] - c['open']) / c['open']) * 100
-            direction = "+" if change >= 0 else ""
-            summary_lines.append(
-                f"{c['datetime'][-8:]}: O={c['open']:.8f} H={c['high']:.8f} L={c['low']:.8f} C={c['close']:.8f} ({direction}{change:.2f}%)"
+        return "\n".join(
+            f"{time}: O={o:.8f} H={h:.8f} L={l:.8f} C={c:.8f} ({change:+.2f}%)"
+            for time, (_, o, h, l, c, _), change in zip(
+                self.candle_times[-10:].tolist(), recent.tolist(), changes.tolist()
             )
-
-        return "\n".join(summary_lines)
+        )
 
 
 async def test_websocket():
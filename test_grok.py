@@ -1,20 +1,13 @@
 """Test Grok API connection."""
 import os
 from openai import OpenAI
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
 
 load_dotenv()
 
 # Get API key
-api_key = os.getenv("GROK_API_KEY")
-if not api_key:
-    # Try reading from .env.example if .env doesn't exist
-    if os.path.exists(".env.example"):
-        with open(".env.example", "r") as f:
-            for line in f:
-                if line.startswith("GROK_API_KEY="):
-                    api_key = line.split("=", 1)[1].strip()
-                    break
+# (falls back to .env.example if .env doesn't exist; a missing file parses as empty)
+api_key = os.getenv("GROK_API_KEY") or dotenv_values(".env.example").get("GROK_API_KEY")
 
 print(f"API Key found: {api_key[:20]}..." if api_key else "No API key found!")
 